@@ -151,9 +151,7 @@ class LocalManifestMaker(egg_info.manifest_maker):
             option_dict, 'skip_git_sdist', 'SKIP_GIT_SDIST'
         )
         if not should_skip:
-            rcfiles = git._find_git_files()
-            if rcfiles:
-                self.filelist.extend(rcfiles)
+            self.filelist.extend(git._iter_git_files())
         elif os.path.exists(self.manifest):
             self.read_manifest()
         ei_cmd = self.get_finalized_command('egg_info')
@@ -166,6 +164,16 @@ class LocalEggInfo(egg_info.egg_info):
 
     command_name = 'egg_info'
 
+    def run(self):
+        # Written first, so that it is among the sources of the package.
+        git.write_version_module(
+            self.distribution.get_name(),
+            self.distribution.get_version(),
+            option_dict=self.distribution.get_option_dict('pbr'),
+        )
+        # egg_info.egg_info is an old style class, can't use super()
+        egg_info.egg_info.run(self)
+
     def find_sources(self):
         """Generate SOURCES.txt only if there isn't one already.
 
@@ -196,10 +204,7 @@ class LocalEggInfo(egg_info.egg_info):
 
 def _from_git(distribution):
     option_dict = distribution.get_option_dict('pbr')
-    changelog = git._iter_log_oneline()
-    if changelog:
-        changelog = git._iter_changelog(changelog)
-    git.write_git_changelog(option_dict=option_dict, changelog=changelog)
+    git.write_git_changelog(option_dict=option_dict)
     git.generate_authors(option_dict=option_dict)
 
 
@@ -15,7 +15,9 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
+import os
 import re
+import sys
 
 _packaging_lib = None
 
@@ -94,18 +96,47 @@ def parse_version(version):
         return pkg_resources.parse_version(version)
 
 
-def evaluate_marker(marker):
+# The compiled markers, by marker string, and the results of evaluating them,
+# by marker string and interpreter.
+_markers = {}
+_marker_results = {}
+
+
+def _get_interpreter_fingerprint():
+    """Return the details of the interpreter that markers depend on.
+
+    These don't change in a running process, but tests may patch them.
+    """
+    return (sys.executable, sys.version, sys.platform, os.name)
+
+
+def _evaluate_marker(marker):
     packaging_lib = _get_packaging_lib()
     if packaging_lib == PACKAGING_LIB_PACKAGING:
         import packaging.markers
 
-        try:
-            return packaging.markers.Marker(marker).evaluate()
-        except packaging.markers.InvalidMarker as e:
-            # setuptools expects a SyntaxError here, so we do the same.
-            # we can't chain the exceptions since that is a Python 3 only thing
-            raise SyntaxError(e)
+        compiled = _markers.get(marker)
+        if compiled is None:
+            try:
+                compiled = packaging.markers.Marker(marker)
+            except packaging.markers.InvalidMarker as e:
+                # setuptools expects a SyntaxError here, so we do the same.
+                # we can't chain the exceptions since that is a Python 3 only
+                # thing
+                raise SyntaxError(e)
+            _markers[marker] = compiled
+        return compiled.evaluate()
     else:  # PACKAGING_LIB_LEGACY
         import pkg_resources
 
         return pkg_resources.evaluate_marker(marker)
+
+
+def evaluate_marker(marker):
+    key = (marker, _get_interpreter_fingerprint())
+    try:
+        return _marker_results[key]
+    except KeyError:
+        pass
+    result = _marker_results[key] = _evaluate_marker(marker)
+    return result
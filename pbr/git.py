@@ -18,16 +18,22 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import collections
 import distutils.errors
 from distutils import log
 import errno
+import functools
+import hashlib
 import io
+import json
 import os
 import re
 import subprocess
+import threading
 import time
 
 import pbr._compat.packaging
+from pbr import git_native
 from pbr import options
 from pbr import version
 
@@ -59,6 +65,53 @@ def _run_shell_command(cmd, throw_on_error=False, buffer=True, env=None):
     return out[0].strip().decode('utf-8', 'replace')
 
 
+# How much output to read from a subprocess at a time when streaming.
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_shell_command(cmd, separator, env=None):
+    """Run cmd, iterating over its output as it is produced.
+
+    Unlike :func:`_run_shell_command`, the output is never held in memory
+    as a whole: it is read from the pipe in chunks and split into records.
+
+    :param cmd: The command to run, as a list.
+    :param separator: The bytes delimiting records in the output, e.g.
+        ``b'\\x00'`` or ``b'\\n'``.
+    :return: An iterator over the decoded records. Empty trailing records
+        are omitted.
+    """
+    newenv = os.environ.copy()
+    if env:
+        newenv.update(env)
+
+    with open(os.devnull, 'wb') as devnull:
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=devnull, env=newenv
+        )
+        finished = False
+        try:
+            read = functools.partial(process.stdout.read, _STREAM_CHUNK_SIZE)
+            pending = b''
+            for chunk in iter(read, b''):
+                records = (pending + chunk).split(separator)
+                pending = records.pop()
+                for record in records:
+                    # Since we don't control the history, decode with
+                    # replace as _run_shell_command does.
+                    yield record.decode('utf-8', 'replace')
+            if pending:
+                yield pending.decode('utf-8', 'replace')
+            finished = True
+        finally:
+            if not finished:
+                # We were abandoned early; closing the pipe lets the process
+                # exit rather than block on a full pipe.
+                process.stdout.close()
+            process.wait()
+            process.stdout.close()
+
+
 def _run_git_command(cmd, git_dir, **kwargs):
     if not isinstance(cmd, (list, tuple)):
         cmd = [cmd]
@@ -67,7 +120,86 @@ def _run_git_command(cmd, git_dir, **kwargs):
     )
 
 
+def _iter_git_command(cmd, git_dir, separator):
+    return _iter_shell_command(
+        ['git', '--git-dir=%s' % git_dir] + cmd, separator
+    )
+
+
+def _use_native_git():
+    """Return whether git repositories may be read without running git.
+
+    The reader in :mod:`pbr.git_native` is opt-in, with ``PBR_NATIVE_GIT``,
+    as it reimplements part of git and can't match it in every case.
+    """
+    return options.get_boolean_option({}, 'native_git', 'PBR_NATIVE_GIT')
+
+
+def _get_native_repository(git_dir):
+    """Return a reader for git_dir that doesn't need to run git, if we can.
+
+    :return: A :class:`pbr.git_native.Repository`, or None if the caller
+        should fall back to running git.
+    """
+    if not _use_native_git():
+        return None
+    try:
+        return git_native.Repository(git_dir)
+    except git_native.UnsupportedRepository:
+        return None
+
+
+# The results of looking for git and the repository, keyed by what they
+# depend on; see _memoize_discovery.
+_discovery_cache = {}
+
+
+def _memoize_discovery(func):
+    """Remember the result of func for the working directory and environment.
+
+    Looking for git and the repository doesn't change within a build, but is
+    done by many of the functions here.
+    """
+
+    @functools.wraps(func)
+    def _wrapper():
+        git_environ = sorted(
+            (name, value)
+            for name, value in os.environ.items()
+            if name.startswith('GIT_')
+        )
+        key = (
+            func.__name__,
+            os.getcwd(),
+            os.environ.get('PATH'),
+            tuple(git_environ),
+        )
+        try:
+            return _discovery_cache[key]
+        except KeyError:
+            result = _discovery_cache[key] = func()
+            return result
+
+    return _wrapper
+
+
+def invalidate_git_discovery():
+    """Forget whether git is installed and where the repository is.
+
+    Both are only looked up once for each working directory and set of
+    ``GIT_*`` environment variables in a process. Call this if either
+    changes otherwise, e.g. after creating a repository.
+    """
+    _discovery_cache.clear()
+
+
+@_memoize_discovery
 def _get_git_directory():
+    if _use_native_git() and git_native.find_executable('git'):
+        try:
+            return git_native.find_git_dir() or ''
+        except git_native.UnsupportedRepository:
+            pass
     try:
         return _run_shell_command(['git', 'rev-parse', '--git-dir'])
     except OSError as e:
@@ -77,7 +209,10 @@ def _get_git_directory():
         raise
 
 
+@_memoize_discovery
 def _git_is_installed():
+    if _use_native_git() and git_native.find_executable('git'):
+        return True
     try:
         # We cannot use 'which git' as it may not be available
         # in some distributions, So just try 'git --version'
@@ -88,35 +223,52 @@ def _git_is_installed():
     return True
 
 
-def _get_highest_tag(tags):
-    """Find the highest tag from a list.
-
-    Pass in a list of tag strings and this will return the highest
-    (latest) as sorted by the (Python) version parsing algorithm.
-    """
-    return max(tags, key=pbr._compat.packaging.parse_version)
-
-
 def _find_git_files(dirname='', git_dir=None):
     """Behave like a file finder entrypoint plugin.
 
     We don't actually use the entrypoints system for this because it runs
     at absurd times. We only want to do this when we are building an sdist.
     """
-    file_list = []
+    return list(_iter_git_files(git_dir))
+
+
+def _iter_git_files(git_dir=None):
+    """Iterate over the files tracked by git.
+
+    The output of ``git ls-files`` is streamed, while the index read by
+    :mod:`pbr.git_native` is read in full first.
+    """
     if git_dir is None:
         git_dir = _run_git_functions()
-    if git_dir:
-        log.info("[pbr] In git context, generating filelist from git")
-        file_list = _run_git_command(['ls-files', '-z'], git_dir)
-        # Users can fix utf8 issues locally with a single commit, so we are
-        # strict here.
-        file_list = file_list.split(b'\x00'.decode('utf-8'))
-    return [f for f in file_list if f]
+    if not git_dir:
+        return
+    log.info("[pbr] In git context, generating filelist from git")
+    file_list = None
+    repository = _get_native_repository(git_dir)
+    if repository is not None:
+        try:
+            file_list = repository.read_index_paths()
+        except git_native.UnsupportedRepository:
+            pass
+    if file_list is None:
+        file_list = _iter_git_command(['ls-files', '-z'], git_dir, b'\x00')
+    for f in file_list:
+        if f:
+            yield f
+
+
+def _describe(git_dir):
+    repository = _get_native_repository(git_dir)
+    if repository is not None:
+        try:
+            return repository.describe()
+        except git_native.UnsupportedRepository:
+            pass
+    return _run_git_command(['describe', '--always'], git_dir)
 
 
 def _get_raw_tag_info(git_dir):
-    describe = _run_git_command(['describe', '--always'], git_dir)
+    describe = _describe(git_dir)
     if "-" in describe:
         return describe.rsplit("-", 2)[-2]
     if "." in describe:
@@ -135,11 +287,33 @@ def _run_git_functions():
     return git_dir or None
 
 
+def _get_worktree_status(exclude=None):
+    """Return a listing of the uncommitted changes to the working tree.
+
+    This is the output of ``git status`` for the current directory, which
+    lists the modified and the untracked files, leaving out any under the
+    path exclude. The files in an untracked directory are not listed, only
+    the directory, as listing them can be slow in large trees.
+    """
+    cmd = ['git', 'status', '--porcelain', '-z', '--untracked-files=normal']
+    if exclude:
+        cmd.extend(['--', ':/', ':(exclude)%s' % exclude])
+    # Don't refresh the index as a side effect, as other git processes may
+    # be running on the same repository.
+    return _run_shell_command(cmd, env={'GIT_OPTIONAL_LOCKS': '0'})
+
+
 def get_git_short_sha(git_dir=None):
     """Return the short sha for this repo, if it exists."""
     if not git_dir:
         git_dir = _run_git_functions()
     if git_dir:
+        repository = _get_native_repository(git_dir)
+        if repository is not None:
+            try:
+                return repository.abbreviate(repository.read_head())
+            except git_native.UnsupportedRepository:
+                pass
         return _run_git_command(['log', '-n1', '--pretty=format:%h'], git_dir)
     return None
 
@@ -164,35 +338,235 @@ def _clean_changelog_message(msg):
     return msg
 
 
-def _iter_changelog(changelog):
-    """Convert a oneline log iterator to formatted strings.
+_CHANGELOG_HEADER = "CHANGES\n=======\n\n"
+# Ends a ChangeLog that does not cover the whole history.
+_CHANGELOG_TRUNCATED = (
+    "Earlier changes are not listed, see the git history of the project for "
+    "the full ChangeLog.\n"
+)
+
+
+class ChangeLogRenderer(object):
+    """Renders the history of a repository in one ChangeLog format.
+
+    The history is walked once for all the formats being written, and each
+    renderer is called for every part of the ChangeLog; see
+    :func:`_iter_changelogs`. Each method returns the text to write for that
+    part, if any.
+    """
+
+    #: The name of the file written, relative to the ChangeLog directory.
+    filename = None
+
+    def start(self):
+        """Return the start of the ChangeLog."""
+        return ''
+
+    def release(self, release, first):
+        """Return the heading of a release.
+
+        :param first: Whether nothing was rendered since :meth:`start`.
+        """
+        return ''
+
+    def change(self, release, sha, msg):
+        """Return the entry for a commit, other than a merge.
+
+        :param release: The release the commit is part of, or None if it is
+            not released yet.
+        :param sha: The abbreviated name of the commit.
+        :param msg: The first line of the commit message.
+        """
+        return ''
+
+    def truncated(self, release, first):
+        """Return the end of a ChangeLog that omits the older releases."""
+        return ''
+
+
+class RSTChangeLogRenderer(ChangeLogRenderer):
+    """Renders the ``ChangeLog`` file included in sdists."""
+
+    filename = 'ChangeLog'
+
+    def start(self):
+        return _CHANGELOG_HEADER
+
+    def release(self, release, first):
+        heading = "%(tag)s\n%(underline)s\n\n" % {
+            'tag': release,
+            'underline': len(release) * '-',
+        }
+        if not first:
+            heading = '\n' + heading
+        return heading
+
+    def change(self, release, sha, msg):
+        if msg.endswith("."):
+            msg = msg[:-1]
+        msg = _clean_changelog_message(msg)
+        return "* %(msg)s\n" % {'msg': msg}
+
+    def truncated(self, release, first):
+        if not first:
+            return '\n' + _CHANGELOG_TRUNCATED
+        return _CHANGELOG_TRUNCATED
+
+
+_markdown_special_re = re.compile(r'([\\`*_{}\[\]<>()#+!|])')
+
+
+class MarkdownChangeLogRenderer(ChangeLogRenderer):
+    """Renders the ChangeLog as Markdown, in ``ChangeLog.md``."""
+
+    filename = 'ChangeLog.md'
+
+    def start(self):
+        return '# CHANGES\n\n'
+
+    def release(self, release, first):
+        if not first:
+            return '\n## %s\n\n' % release
+        return '## %s\n\n' % release
+
+    def change(self, release, sha, msg):
+        if msg.endswith("."):
+            msg = msg[:-1]
+        return '* %s\n' % _markdown_special_re.sub(r'\\\1', msg)
+
+    def truncated(self, release, first):
+        if not first:
+            return '\n' + _CHANGELOG_TRUNCATED
+        return _CHANGELOG_TRUNCATED
+
+
+class JSONLinesChangeLogRenderer(ChangeLogRenderer):
+    """Renders one JSON object per commit, in ``ChangeLog.jsonl``.
+
+    Each object has the ``sha`` of the commit, the ``release`` it is part
+    of, or null if it is not released yet, and the unmodified ``subject``
+    of the commit.
+    """
+
+    filename = 'ChangeLog.jsonl'
+
+    def change(self, release, sha, msg):
+        entry = {'sha': sha, 'release': release, 'subject': msg}
+        return json.dumps(entry, sort_keys=True) + '\n'
+
+
+# The ChangeLog formats built in to pbr, by the name used in the
+# changelog_formats option.
+_changelog_renderers = {
+    'rst': RSTChangeLogRenderer,
+    'markdown': MarkdownChangeLogRenderer,
+    'jsonl': JSONLinesChangeLogRenderer,
+}
+
+
+def _iter_changelogs(
+    changelog, renderers, tag_index=None, max_releases=None, since=None
+):
+    """Render a oneline log iterator in several formats at once.
+
+    The changelog iterator is consumed lazily, and not at all past the
+    point where the limits given by max_releases or since are reached.
 
     :param changelog: An iterator of one line log entries like
         that given by _iter_log_oneline.
-    :return: An iterator over (release, formatted changelog) tuples.
+    :param renderers: A list of :class:`ChangeLogRenderer` instances.
+    :param tag_index: The :class:`TagIndex` of the repository the entries
+        are from, if known.
+    :param max_releases: If given, the number of releases to include, in
+        addition to any unreleased changes.
+    :param since: If given, a version; only the releases that are newer are
+        included.
+    :return: An iterator over (renderer, release, formatted changelog)
+        tuples.
     """
+    if tag_index is None:
+        tag_index = _default_tag_index
+    if since:
+        since = tag_index.get_sort_key(since.replace('-', '.'))
+
+    def _render(method_name, *args):
+        for renderer in renderers:
+            content = getattr(renderer, method_name)(*args)
+            if content:
+                yield renderer, current_release, content
+
+    releases = 0
     first_line = True
     current_release = None
-    yield current_release, "CHANGES\n=======\n\n"
+    for rendered in _render('start'):
+        yield rendered
     for hash, tags, msg in changelog:
         if tags:
-            current_release = _get_highest_tag(tags)
-            underline = len(current_release) * '-'
-            if not first_line:
-                yield current_release, '\n'
-            yield current_release, (
-                "%(tag)s\n%(underline)s\n\n"
-                % {'tag': current_release, 'underline': underline}
-            )
+            release = tag_index.get_highest_tag(tags)
+            releases += 1
+            if (max_releases is not None and releases > max_releases) or (
+                since and tag_index.get_sort_key(release) <= since
+            ):
+                for rendered in _render(
+                    'truncated', current_release, first_line
+                ):
+                    yield rendered
+                return
+            current_release = release
+            for rendered in _render('release', current_release, first_line):
+                yield rendered
 
         if not msg.startswith("Merge "):
-            if msg.endswith("."):
-                msg = msg[:-1]
-            msg = _clean_changelog_message(msg)
-            yield current_release, "* %(msg)s\n" % {'msg': msg}
+            for rendered in _render('change', current_release, hash, msg):
+                yield rendered
         first_line = False
 
 
+def _iter_changelog(changelog, tag_index=None, max_releases=None, since=None):
+    """Convert a oneline log iterator to formatted strings.
+
+    See :func:`_iter_changelogs` for the parameters.
+
+    :return: An iterator over (release, formatted changelog) tuples, in the
+        format of the ``ChangeLog`` file.
+    """
+    rendered = _iter_changelogs(
+        changelog, [RSTChangeLogRenderer()], tag_index, max_releases, since
+    )
+    for _, release, content in rendered:
+        yield release, content
+
+
+def _get_changelog_limits(option_dict):
+    """Return the changelog_max_releases and changelog_since options.
+
+    :return: A (max_releases, since) tuple, where either may be None if the
+        option is not set.
+    """
+    max_releases = option_dict.get('changelog_max_releases', (None, None))[1]
+    if max_releases:
+        try:
+            max_releases = int(max_releases)
+        except ValueError:
+            max_releases = -1
+        if max_releases < 0:
+            raise distutils.errors.DistutilsOptionError(
+                'changelog_max_releases must be a non-negative integer, '
+                'not %r' % option_dict['changelog_max_releases'][1]
+            )
+    else:
+        max_releases = None
+    since = option_dict.get('changelog_since', (None, None))[1] or None
+    if since:
+        try:
+            pbr._compat.packaging.parse_version(since.replace('-', '.'))
+        except ValueError:
+            raise distutils.errors.DistutilsOptionError(
+                'changelog_since must be a version, not %r' % since
+            )
+    return max_releases, since
+
+
 def _iter_log_oneline(git_dir=None):
     """Iterate over --oneline log entries if possible.
 
@@ -210,12 +584,732 @@ def _iter_log_oneline(git_dir=None):
     return _iter_log_inner(git_dir)
 
 
-def _is_valid_version(candidate):
+class TagIndex(object):
+    """The tags of a repository, each parsed once.
+
+    The ChangeLog, the version calculation and the log parsing all need to
+    know which tags are versions and how they sort, so the tags are parsed
+    once up front and shared by all of them.
+
+    Tags are looked up by name with any ``-`` replaced by ``.``, as given by
+    :func:`_parse_refnames`. Names that are not in the index, e.g. because
+    the tag was created after the index was built, are parsed when first
+    looked up.
+
+    :param names: The names of the tags of the repository.
+    """
+
+    def __init__(self, names=()):
+        self._semantic_versions = {}
+        self._sort_keys = {}
+        self._names = frozenset(names)
+        self._has_versions = False
+        for name in names:
+            candidate = name.replace('-', '.')
+            if self.get_semantic_version(candidate) is not None:
+                self.get_sort_key(candidate)
+                self._has_versions = True
+
+    def has_name(self, name):
+        """Return whether name is the name of a tag, as git knows it."""
+        return name in self._names
+
+    def has_versions(self):
+        """Return whether any of the tags given up front is a version."""
+        return self._has_versions
+
+    def get_semantic_version(self, candidate):
+        """Return the SemanticVersion of candidate, or None if it has none."""
+        try:
+            return self._semantic_versions[candidate]
+        except KeyError:
+            pass
+        try:
+            semver = version.SemanticVersion.from_pip_string(candidate)
+        except ValueError:
+            semver = None
+        self._semantic_versions[candidate] = semver
+        return semver
+
+    def get_sort_key(self, candidate):
+        """Return the key to sort candidate by, as a Python version."""
+        try:
+            return self._sort_keys[candidate]
+        except KeyError:
+            key = pbr._compat.packaging.parse_version(candidate)
+            self._sort_keys[candidate] = key
+            return key
+
+    def get_version_tag(self, tags):
+        """Return the highest version in tags, or None if there are none."""
+        versions = []
+        for tag in tags:
+            semver = self.get_semantic_version(tag)
+            if semver is not None:
+                versions.append((semver, tag))
+        if versions:
+            return max(versions)[1]
+        return None
+
+    def get_highest_tag(self, tags):
+        """Find the highest tag from a list.
+
+        Pass in a list of tag strings and this will return the highest
+        (latest) as sorted by the (Python) version parsing algorithm.
+        """
+        return max(tags, key=self.get_sort_key)
+
+
+# Used for tags that are not known to be from a particular repository.
+_default_tag_index = TagIndex()
+
+
+def _read_tag_names(git_dir):
+    """Return the names of the tags of git_dir."""
+    repository = _get_native_repository(git_dir)
+    if repository is not None:
+        try:
+            return list(repository.read_tags())
+        except git_native.UnsupportedRepository:
+            pass
+    refs = _run_git_command(
+        ['for-each-ref', '--format=%(refname)', 'refs/tags'], git_dir
+    )
+    return [
+        ref[len('refs/tags/') :]
+        for ref in refs.split('\n')
+        if ref.startswith('refs/tags/')
+    ]
+
+
+# The TagIndex of each git directory, with the digest of the tags it was
+# built from.
+_tag_indexes = {}
+
+
+def get_tag_index(git_dir, state=None):
+    """Return the :class:`TagIndex` of the tags of git_dir.
+
+    The index is shared by all callers in the process, and only rebuilt when
+    the tags change.
+
+    :param state: The current ``_RefsState`` of git_dir, if the caller
+        already has it.
+    """
+    if state is None:
+        state = _get_refs_state(git_dir)
+    key = os.path.abspath(git_dir)
+    cached = _tag_indexes.get(key)
+    if cached is None or cached[0] != state.tags:
+        cached = (state.tags, TagIndex(_read_tag_names(git_dir)))
+        _tag_indexes[key] = cached
+    return cached[1]
+
+
+def _parse_refnames(refname, tag_index):
+    """Extract the version tags from a git log decoration.
+
+    :param tag_index: The :class:`TagIndex` of the repository.
+    :return: A frozenset of the valid version tags in the decoration.
+    """
+    tags = set()
+
+    # refname can be:
+    #  <empty>
+    #  HEAD, tag: refs/tags/1.4.0, refs/remotes/origin/master, \
+    #    refs/heads/master
+    #  refs/tags/1.3.4
+    if "refs/tags/" in refname:
+        refname = refname.strip()[1:-1]  # remove wrapping ()'s
+        # If we start with "tag: refs/tags/1.2b1, tag: refs/tags/1.2"
+        # The first split gives us "['', '1.2b1, tag:', '1.2']"
+        # Which is why we do the second split below on the comma
+        for tag_string in refname.split("refs/tags/")[1:]:
+            # git tag does not allow : or " " in tag names, so we split
+            # on ", " which is the separator between elements
+            candidate = tag_string.split(", ")[0].replace("-", ".")
+            if tag_index.get_semantic_version(candidate) is not None:
+                tags.add(candidate)
+
+    return frozenset(tags)
+
+
+def _iter_semver_symbols(message):
+    """Iterate over the Sem-Ver symbols found in a commit message.
+
+    See the pbr docs for the syntax of Sem-Ver headers.
+    """
+    header = 'sem-ver:'
+    for line in message.split("\n"):
+        line = line.lower().strip()
+        if not line.startswith(header):
+            continue
+        for symbol in line[len(header) :].strip().split(","):
+            yield symbol.strip()
+
+
+_co_author_re = re.compile('Co-authored-by:.+', re.MULTILINE)
+
+
+def _iter_co_authors(message):
+    """Iterate over the co-authors credited in a commit message."""
+    for signed in _co_author_re.findall(message):
+        yield signed.split(":", 1)[1].strip()
+
+
+# The fields requested from git log for each commit, in order. Only the
+# Co-authored-by trailers of the message are needed, so git is asked for
+# those rather than the raw body, which for most histories is the bulk of
+# the log. They come last as they are the only field that may contain
+# newlines.
+_LOG_FORMAT = '%x00'.join(
+    [
+        '%H',
+        '%h',
+        '%P',
+        '%aN <%aE>',
+        '%d',
+        '%s',
+        '%(trailers:key=Co-authored-by,unfold)',
+    ]
+)
+# git older than 2.22 does not know the trailer options and prints the
+# placeholder as is, in which case the raw body is read instead.
+_BODY_LOG_FORMAT = '%x00'.join(
+    ['%H', '%h', '%P', '%aN <%aE>', '%d', '%s', '%B']
+)
+_LOG_FIELD_COUNT = 7
+
+
+_Commit = collections.namedtuple(
+    '_Commit',
+    [
+        'sha',
+        'short_sha',
+        'parents',
+        'author',
+        'tags',
+        'subject',
+        'co_authors',
+    ],
+)
+
+
+def _read_semver_symbols(revisions, git_dir):
+    """Return the Sem-Ver symbols used in the commits given by revisions.
+
+    git only returns the messages that mention a Sem-Ver header, so the
+    amount read depends on how many commits use them rather than on the
+    number and size of the commits.
+    """
+    cmd = [
+        'log',
+        '-z',
+        '--regexp-ignore-case',
+        '--fixed-strings',
+        '--grep=sem-ver:',
+        '--format=%B',
+    ] + list(revisions)
+    symbols = set()
+    for message in _iter_git_command(cmd, git_dir, b'\x00'):
+        symbols.update(_iter_semver_symbols(message))
+    return symbols
+
+
+def _log_command(revisions, log_format=None):
+    return [
+        'log',
+        '--decorate=full',
+        '-z',
+        '--format=' + (log_format or _LOG_FORMAT),
+    ] + list(revisions)
+
+
+def _read_log(revisions, git_dir, tag_index):
+    """Run a _log_command, parsing its output into a list of _Commit tuples.
+
+    The output is parsed as it is streamed from git, so that only the
+    parsed commits and not the raw log are ever held in memory.
+    """
+    commits = _parse_log(_log_command(revisions), git_dir, tag_index)
+    if commits is None:
+        commits = _parse_log(
+            _log_command(revisions, _BODY_LOG_FORMAT), git_dir, tag_index
+        )
+    return commits
+
+
+def _parse_log(cmd, git_dir, tag_index):
+    """Parse the output of cmd into a list of _Commit tuples.
+
+    :return: The commits, or None if git did not understand the trailer
+        placeholder of :data:`_LOG_FORMAT`.
+    """
+    fields = _iter_git_command(cmd, git_dir, b'\x00')
+    commits = []
+    # Authors repeat a lot over a long history, so share the strings.
+    authors = {}
+    record = []
+    for field in fields:
+        record.append(field)
+        if len(record) < _LOG_FIELD_COUNT:
+            continue
+        sha, short_sha, parents, author, refname, subject, trailers = record
+        record = []
+        if trailers.startswith('%(trailers'):
+            fields.close()
+            return None
+        commits.append(
+            _Commit(
+                sha=sha,
+                short_sha=short_sha,
+                parents=tuple(parents.split()),
+                author=authors.setdefault(author, author),
+                tags=_parse_refnames(refname, tag_index),
+                subject=subject,
+                co_authors=tuple(_iter_co_authors(trailers)),
+            )
+        )
+    return commits
+
+
+class GitHistorySnapshot(object):
+    """An in-memory view of the history of a git repository.
+
+    The ChangeLog, the AUTHORS file and the version calculation all need to
+    walk the full history of the repository. Rather than running ``git log``
+    for each of them, the snapshot reads the history once and serves all of
+    those consumers from the parsed result.
+
+    :param git_dir: The git directory the history was read from.
+    :param state: The ``_RefsState`` of the repository the history was read
+        at. See :func:`_get_refs_state`.
+    :param commits: A list of ``_Commit`` tuples, in ``git log`` order.
+    """
+
+    def __init__(self, git_dir, state, commits):
+        self.git_dir = git_dir
+        self.state = state
+        self.commits = commits
+        self._by_sha = dict((commit.sha, commit) for commit in commits)
+
+    @classmethod
+    def load(klass, git_dir, state=None):
+        """Read the full history of git_dir into a new snapshot."""
+        tag_index = get_tag_index(git_dir, state)
+        return klass(git_dir, state, _read_log([], git_dir, tag_index))
+
+    def update(self, state):
+        """Return a new snapshot extended to the HEAD given by state.
+
+        Only the commits added since this snapshot was taken are read from
+        git. The tags and the mailmap must not have changed in the meantime.
+
+        :return: A new :class:`GitHistorySnapshot`, or None if the history
+            cannot be extended, e.g. because it was rewritten.
+        """
+        new_commits = _read_log(
+            ['%s..%s' % (self.state.head, state.head)],
+            self.git_dir,
+            get_tag_index(self.git_dir, state),
+        )
+        # If HEAD descends from our old HEAD, one of the new commits must
+        # have it as a parent.
+        if not any(self.state.head in c.parents for c in new_commits):
+            return None
+        by_sha = dict(self._by_sha)
+        by_sha.update((commit.sha, commit) for commit in new_commits)
+        # Take the order from git itself, as the log order of a merge may
+        # interleave new commits with ones we already know about.
+        order = _iter_git_command(
+            ['rev-list', state.head], self.git_dir, b'\n'
+        )
+        try:
+            commits = [by_sha[sha] for sha in order]
+        except KeyError:
+            return None
+        return GitHistorySnapshot(self.git_dir, state, commits)
+
+    def iter_log(self):
+        """Iterate over (hash, tags_set, 1st_line) tuples in log order."""
+        for commit in self.commits:
+            yield commit.short_sha, commit.tags, commit.subject
+
+    def get_revno_and_last_tag(self):
+        """Return the most recent version tag and the distance to it.
+
+        If there are no version tags, the tag is the empty string and the
+        distance is the number of commits in the history.
+        """
+        tag_index = get_tag_index(self.git_dir, self.state)
+        row_count = 0
+        for row_count, commit in enumerate(self.commits):
+            tag = tag_index.get_version_tag(commit.tags)
+            if tag is not None:
+                return tag, row_count
+
+        return "", row_count
+
+    def get_semver_symbols(self, tag=None):
+        """Return the Sem-Ver symbols used since tag.
+
+        The snapshot does not hold the commit messages, so git is asked for
+        the ones that mention a Sem-Ver header. See
+        :func:`_read_semver_symbols`.
+
+        :param tag: A version tag, as given by :meth:`iter_log`. If not
+            given, every commit in the history is considered.
+        :return: A set of the symbols, or None if tag is not known to the
+            snapshot.
+        """
+        if not self.commits:
+            return set()
+        head = self.commits[0].sha
+        if not tag:
+            return _read_semver_symbols([head], self.git_dir)
+        for commit in self.commits:
+            if tag in commit.tags:
+                return _read_semver_symbols(
+                    ['%s..%s' % (commit.sha, head)], self.git_dir
+                )
+        return None
+
+    def get_authors(self):
+        """Return the set of commit authors, as ``name <email>`` strings."""
+        return set(commit.author for commit in self.commits)
+
+    def get_co_authors(self):
+        """Return the set of co-authors credited in commit messages."""
+        co_authors = set()
+        for commit in self.commits:
+            co_authors.update(commit.co_authors)
+        return co_authors
+
+
+_RefsState = collections.namedtuple('_RefsState', ['head', 'tags', 'mailmap'])
+
+
+def _read_refs_natively(git_dir):
+    """Return HEAD and the tag lines of ``git show-ref`` without running it.
+
+    :raises git_native.UnsupportedRepository: If git needs to be run.
+    """
+    repository = _get_native_repository(git_dir)
+    if repository is None:
+        raise git_native.UnsupportedRepository('native reader is disabled')
+    tags = []
+    for name, sha, peeled in repository.read_peeled_tags():
+        tags.append('%s refs/tags/%s' % (sha, name))
+        if peeled != sha:
+            tags.append('%s refs/tags/%s^{}' % (peeled, name))
+    return repository.read_head(), tags
+
+
+def _get_mailmap_state(git_dir):
+    """Return a digest of the mailmap git applies to the authors of git_dir.
+
+    git reads the ``.mailmap`` file of the current directory, as the
+    commands are run with ``--git-dir``, and any given by the ``mailmap.file``
+    and ``mailmap.blob`` configuration. The configuration is only asked for
+    when a configuration file mentions it.
+    """
+    digest = hashlib.sha1()
+    paths = [os.path.join(os.getcwd(), '.mailmap')]
+    config_paths = git_native._get_global_config_paths() + [
+        os.path.join(git_dir, 'config'),
+        os.path.join(git_dir, 'config.worktree'),
+    ]
+    commondir_path = os.path.join(git_dir, 'commondir')
+    if os.path.exists(commondir_path):
+        with open(commondir_path, 'r') as commondir_file:
+            common_dir = os.path.join(git_dir, commondir_file.read().strip())
+        config_paths.append(os.path.join(common_dir, 'config'))
+    configured = False
+    for path in config_paths:
+        try:
+            with open(path, 'rb') as config_file:
+                configured = b'mailmap' in config_file.read().lower()
+        except EnvironmentError:
+            continue
+        if configured:
+            break
+    if configured:
+        config = _run_git_command(
+            ['config', '--get-regexp', r'^mailmap\.'], git_dir
+        )
+        digest.update(config.encode('utf-8'))
+        for line in config.split('\n'):
+            name, _, value = line.partition(' ')
+            if name.lower() == 'mailmap.file':
+                paths.append(os.path.expanduser(value))
+            elif name.lower() == 'mailmap.blob':
+                blob = _run_git_command(
+                    ['rev-parse', '--verify', '-q', value], git_dir
+                )
+                digest.update(blob.encode('utf-8'))
+    for path in paths:
+        try:
+            with open(path, 'rb') as mailmap_file:
+                digest.update(mailmap_file.read())
+        except EnvironmentError:
+            pass
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def _get_refs_state(git_dir):
+    """Return the current HEAD of git_dir, and digests of its tags and mailmap.
+
+    The authors in the history are read with the mailmap applied, so a
+    snapshot is only good for as long as the mailmap is unchanged too.
+    """
     try:
-        version.SemanticVersion.from_pip_string(candidate)
-        return True
-    except ValueError:
-        return False
+        head, tags = _read_refs_natively(git_dir)
+    except git_native.UnsupportedRepository:
+        head = None
+        tags = []
+        refs = _run_git_command(
+            ['show-ref', '--head', '--tags', '-d'], git_dir
+        )
+        for line in refs.split('\n'):
+            sha, _, ref = line.partition(' ')
+            if ref == 'HEAD':
+                head = sha
+            elif ref.startswith('refs/tags/'):
+                tags.append(line)
+    digest = hashlib.sha1('\n'.join(tags).encode('utf-8')).hexdigest()
+    return _RefsState(head, digest, _get_mailmap_state(git_dir))
+
+
+# Bump this whenever the layout of the cache file changes.
+_HISTORY_CACHE_VERSION = 3
+
+
+def _get_history_cache_path(git_dir):
+    return os.path.join(git_dir, 'pbr-cache', 'history.json')
+
+
+def _read_history_cache(git_dir):
+    """Load the snapshot persisted in git_dir, if there is a usable one."""
+    try:
+        with open(_get_history_cache_path(git_dir), 'r') as cache_file:
+            data = json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return None
+    if (
+        data.get('version') != _HISTORY_CACHE_VERSION
+        or data.get('format') != _LOG_FORMAT
+    ):
+        return None
+    commits = [
+        _Commit(
+            sha=sha,
+            short_sha=short_sha,
+            parents=tuple(parents),
+            author=author,
+            tags=frozenset(tags),
+            subject=subject,
+            co_authors=tuple(co_authors),
+        )
+        for (
+            sha,
+            short_sha,
+            parents,
+            author,
+            tags,
+            subject,
+            co_authors,
+        ) in data['commits']
+    ]
+    return GitHistorySnapshot(git_dir, _RefsState(*data['state']), commits)
+
+
+def _write_history_cache(snapshot):
+    """Persist snapshot so that later processes can reuse it."""
+    path = _get_history_cache_path(snapshot.git_dir)
+    data = {
+        'version': _HISTORY_CACHE_VERSION,
+        'format': _LOG_FORMAT,
+        'state': list(snapshot.state),
+        'commits': [
+            [
+                commit.sha,
+                commit.short_sha,
+                list(commit.parents),
+                commit.author,
+                sorted(commit.tags),
+                commit.subject,
+                list(commit.co_authors),
+            ]
+            for commit in snapshot.commits
+        ],
+    }
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        # Write to a temporary file first so that concurrent builds never
+        # see a partially written cache.
+        temp_path = '%s.%d' % (path, os.getpid())
+        with open(temp_path, 'w') as cache_file:
+            json.dump(data, cache_file)
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+    except (IOError, OSError) as e:
+        log.info('[pbr] Unable to write git history cache: %s' % e)
+
+
+def _skip_history_cache():
+    return options.get_boolean_option(
+        {}, 'skip_git_history_cache', 'SKIP_GIT_HISTORY_CACHE'
+    )
+
+
+def _load_history(git_dir, state):
+    """Load the history of git_dir, using the on-disk cache if possible."""
+    if not state.head or _skip_history_cache():
+        return GitHistorySnapshot.load(git_dir, state)
+
+    snapshot = _read_history_cache(git_dir)
+    if snapshot is not None and snapshot.state == state:
+        return snapshot
+    if (
+        snapshot is not None
+        and snapshot.state.tags == state.tags
+        and snapshot.state.mailmap == state.mailmap
+    ):
+        snapshot = snapshot.update(state)
+    else:
+        snapshot = None
+    if snapshot is None:
+        snapshot = GitHistorySnapshot.load(git_dir, state)
+    _write_history_cache(snapshot)
+    return snapshot
+
+
+# Snapshots of the history of each git directory seen by this process.
+_history_snapshots = {}
+# Serialises loading snapshots, so that concurrent callers share one read.
+_history_lock = threading.Lock()
+
+
+def get_history_snapshot(git_dir=None):
+    """Return a snapshot of the history of git_dir.
+
+    Snapshots are shared by all callers in the process, and persisted in
+    the git directory for use by later processes. A snapshot is reused for
+    as long as HEAD, the tags and the mailmap of the repository are
+    unchanged; when only HEAD has moved, just the new commits are read.
+
+    :return: A :class:`GitHistorySnapshot`, or None if not in a git context.
+    """
+    if git_dir is None:
+        git_dir = _get_git_directory()
+    if not git_dir:
+        return None
+    with _history_lock:
+        state = _get_refs_state(git_dir)
+        key = os.path.abspath(git_dir)
+        snapshot = _history_snapshots.get(key)
+        if snapshot is None or state.head is None or snapshot.state != state:
+            snapshot = _load_history(git_dir, state)
+            _history_snapshots[key] = snapshot
+        return snapshot
+
+
+# Globs matching every tag that can be a version; see
+# version.SemanticVersion.from_pip_string.
+_VERSION_TAG_PATTERNS = ('[0-9]*', '[vV]*')
+
+_describe_re = re.compile(r'^(?P<tag>.+)-(?P<distance>[0-9]+)-g[0-9a-f]+$')
+
+_RecentHistory = collections.namedtuple(
+    '_RecentHistory', ['tag', 'distance', 'semver_symbols']
+)
+
+
+def _read_recent_history(git_dir, tag_index):
+    """Find the most recent version tag without reading the whole history.
+
+    ``git describe`` finds the nearest tag that looks like a version, and only
+    the commits since it are read. This gives the same answer as walking the
+    history in ``git log`` order, as :class:`GitHistorySnapshot` does, as long
+    as the tag is a version and there are no merges since it.
+
+    :return: A _RecentHistory, or None if the history needs to be walked.
+    """
+    cmd = ['describe', '--tags', '--long', '--always']
+    cmd.extend('--match=%s' % pattern for pattern in _VERSION_TAG_PATTERNS)
+    describe = _run_git_command(cmd, git_dir)
+    match = _describe_re.match(describe)
+    if match is None:
+        if not re.match('^[0-9a-f]+$', describe):
+            # Something went wrong, e.g. there are no commits
+            return None
+        if tag_index.has_versions():
+            # git before 2.13 only honours the last --match, so it can miss
+            # the version tags there are; walk the history instead.
+            return None
+        # There are no version tags, so the distance is the number of commits
+        # as counted by the walk.
+        count = _run_git_command(['rev-list', '--count', 'HEAD'], git_dir)
+        return _RecentHistory(
+            '',
+            max(int(count) - 1, 0),
+            frozenset(_read_semver_symbols(['HEAD'], git_dir)),
+        )
+
+    # Only the structure of the history is needed here, not the messages.
+    tag_commit = 'refs/tags/%s^{commit}' % match.group('tag')
+    cmd = [
+        'log',
+        '--decorate=full',
+        '-z',
+        '--format=%H%x00%P%x00%d',
+        'HEAD',
+        '--not',
+        tag_commit + '^@',
+    ]
+    fields = list(_iter_git_command(cmd, git_dir, b'\x00'))
+    for row_count in range(len(fields) // 3):
+        sha, parents, refname = fields[row_count * 3 : row_count * 3 + 3]
+        tag = tag_index.get_version_tag(_parse_refnames(refname, tag_index))
+        if tag is not None:
+            symbols = _read_semver_symbols([sha + '..HEAD'], git_dir)
+            return _RecentHistory(tag, row_count, frozenset(symbols))
+        if len(parents.split()) != 1:
+            # After a merge git log interleaves the merged branches by date.
+            return None
+    return None
+
+
+# The recent history of each git directory, with the _RefsState it was read
+# at.
+_recent_histories = {}
+
+
+def get_recent_history(git_dir):
+    """Return the most recent version tag and the commits since it.
+
+    This is much cheaper than :func:`get_history_snapshot` for repositories
+    with a long history, but only answers questions about the commits since
+    the last version tag.
+
+    :return: A _RecentHistory of the tag, the distance to it and the Sem-Ver
+        symbols used since, with the same values as those given by a
+        :class:`GitHistorySnapshot`; or None if that can't be determined
+        without reading the whole history.
+    """
+    state = _get_refs_state(git_dir)
+    key = os.path.abspath(git_dir)
+    cached = _recent_histories.get(key)
+    if cached is None or state.head is None or cached[0] != state:
+        cached = (
+            state,
+            _read_recent_history(git_dir, get_tag_index(git_dir, state)),
+        )
+        _recent_histories[key] = cached
+    return cached[1]
 
 
 def _iter_log_inner(git_dir):
@@ -233,39 +1327,154 @@ def _iter_log_inner(git_dir):
     :return: An iterator of (hash, tags_set, 1st_line) tuples.
     """
     log.info('[pbr] Generating ChangeLog')
-    log_cmd = ['log', '--decorate=full', '--format=%h%x00%s%x00%d']
-    changelog = _run_git_command(log_cmd, git_dir)
-    for line in changelog.split('\n'):
-        line_parts = line.split('\x00')
-        if len(line_parts) != 3:
-            continue
-        sha, msg, refname = line_parts
-        tags = set()
-
-        # refname can be:
-        #  <empty>
-        #  HEAD, tag: refs/tags/1.4.0, refs/remotes/origin/master, \
-        #    refs/heads/master
-        #  refs/tags/1.3.4
-        if "refs/tags/" in refname:
-            refname = refname.strip()[1:-1]  # remove wrapping ()'s
-            # If we start with "tag: refs/tags/1.2b1, tag: refs/tags/1.2"
-            # The first split gives us "['', '1.2b1, tag:', '1.2']"
-            # Which is why we do the second split below on the comma
-            for tag_string in refname.split("refs/tags/")[1:]:
-                # git tag does not allow : or " " in tag names, so we split
-                # on ", " which is the separator between elements
-                candidate = tag_string.split(", ")[0].replace("-", ".")
-                if _is_valid_version(candidate):
-                    tags.add(candidate)
-
-        yield sha, tags, msg
+    for entry in get_history_snapshot(git_dir).iter_log():
+        yield entry
+
+
+# Bump this whenever the layout of the ChangeLog marker changes.
+_CHANGELOG_CACHE_VERSION = 1
+
+
+def _get_changelog_cache_path(git_dir):
+    return os.path.join(git_dir, 'pbr-cache', 'changelog.json')
+
+
+def _get_changelog_digest(content):
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def _update_changelog(snapshot, path):
+    """Bring the ChangeLog at path up to date with snapshot.
+
+    Rather than rendering the whole history again, only the commits added
+    since the ChangeLog was written are rendered, and spliced in front of
+    its existing content. The commit the ChangeLog was written at is
+    recorded in the pbr-cache directory of the repository, see
+    :func:`_write_changelog_marker`.
+
+    :return: The new content of the ChangeLog, or None if it has to be
+        rewritten from scratch, e.g. because it was modified, the tags
+        changed or the history was rewritten.
+    """
+    try:
+        with open(_get_changelog_cache_path(snapshot.git_dir), 'r') as f:
+            marker = json.load(f)
+        with io.open(path, 'r', encoding='utf-8') as changelog_file:
+            content = changelog_file.read()
+    except (IOError, OSError, ValueError):
+        return None
+    if (
+        marker.get('version') != _CHANGELOG_CACHE_VERSION
+        or marker.get('path') != os.path.abspath(path)
+        or marker.get('tags') != snapshot.state.tags
+        or marker.get('digest') != _get_changelog_digest(content)
+        or not content.startswith(_CHANGELOG_HEADER)
+    ):
+        return None
+
+    head = marker.get('head')
+    new_commits = set()
+    for index, commit in enumerate(snapshot.commits):
+        if commit.sha == head:
+            break
+        new_commits.add(commit.sha)
+    else:
+        return None
+    # Each new commit must descend from the old head through new commits
+    # only, and all of them must come before it in the log. The log of the
+    # old head, which is what the ChangeLog holds, then follows unchanged.
+    for commit in snapshot.commits[:index]:
+        if not new_commits.union([head]).issuperset(commit.parents):
+            return None
+    if len(snapshot.commits) - index != marker.get('count'):
+        return None
+    if not index:
+        return content
+
+    new_entries = [
+        (commit.short_sha, commit.tags, commit.subject)
+        for commit in snapshot.commits[:index]
+    ]
+    tag_index = get_tag_index(snapshot.git_dir, snapshot.state)
+    new_content = [
+        entry for _, entry in _iter_changelog(new_entries, tag_index)
+    ]
+    # The header is already part of the content.
+    del new_content[0]
+    if snapshot.commits[index].tags:
+        # Release headings are only preceded by a blank line if they do not
+        # come first.
+        new_content.append('\n')
+    return ''.join(
+        [_CHANGELOG_HEADER] + new_content + [content[len(_CHANGELOG_HEADER) :]]
+    )
+
+
+def _write_changelog_marker(snapshot, path, digest):
+    """Record that the ChangeLog at path was written from snapshot."""
+    cache_path = _get_changelog_cache_path(snapshot.git_dir)
+    marker = {
+        'version': _CHANGELOG_CACHE_VERSION,
+        'path': os.path.abspath(path),
+        'head': snapshot.state.head,
+        'tags': snapshot.state.tags,
+        'count': len(snapshot.commits),
+        'digest': digest,
+    }
+    try:
+        if not os.path.isdir(os.path.dirname(cache_path)):
+            os.makedirs(os.path.dirname(cache_path))
+        with open(cache_path, 'w') as cache_file:
+            json.dump(marker, cache_file)
+    except (IOError, OSError) as e:
+        log.info('[pbr] Unable to write ChangeLog marker: %s' % e)
+
+
+def _get_changelog_renderers(option_dict):
+    """Return a renderer for each format given by the changelog_formats option.
+
+    Formats are either the name of one built in to pbr, as listed in
+    :data:`_changelog_renderers`, or the dotted name of a
+    :class:`ChangeLogRenderer` subclass. Only the ``ChangeLog`` itself is
+    written by default.
+    """
+    formats = option_dict.get('changelog_formats', (None, 'rst'))[1]
+    renderers = []
+    for name in formats.replace(',', ' ').split():
+        renderer_class = _changelog_renderers.get(name)
+        if renderer_class is None and '.' in name:
+            # pbr.setupcfg imports this module, through pbr.hooks
+            from pbr import setupcfg
+
+            try:
+                renderer_class = setupcfg.resolve_name(name)
+            except ImportError:
+                pass
+        if renderer_class is None:
+            raise distutils.errors.DistutilsOptionError(
+                'Unknown ChangeLog format %r' % name
+            )
+        renderer = renderer_class()
+        if not renderer.filename:
+            raise distutils.errors.DistutilsOptionError(
+                'ChangeLog format %r does not name a file' % name
+            )
+        renderers.append(renderer)
+    return renderers
 
 
 def write_git_changelog(
     git_dir=None, dest_dir=os.path.curdir, option_dict=None, changelog=None
 ):
-    """Write a changelog based on the git changelog."""
+    """Write a changelog based on the git changelog.
+
+    Unless changelog is given, the ChangeLog is written in each of the
+    formats given by the ``changelog_formats`` option, from a single walk
+    of the history. The ``changelog_max_releases`` and ``changelog_since``
+    options limit the releases included. A ``ChangeLog`` previously written
+    on its own by this function is only extended with the commits added
+    since, as long as the git history cache is enabled.
+    """
     if option_dict is None:
         option_dict = {}
 
@@ -276,30 +1485,84 @@ def write_git_changelog(
         return
 
     start = time.time()
-    if not changelog:
-        changelog = _iter_log_oneline(git_dir=git_dir)
-        if changelog:
-            changelog = _iter_changelog(changelog)
-    if not changelog:
-        return
-
-    new_changelog = os.path.join(dest_dir, 'ChangeLog')
-    if os.path.exists(new_changelog) and not os.access(new_changelog, os.W_OK):
-        # If there's already a ChangeLog and it's not writable, just use it
-        log.info(
-            '[pbr] ChangeLog not written (file already'
-            ' exists and it is not writeable)'
+    snapshot = None
+    if changelog:
+        renderers = [RSTChangeLogRenderer()]
+        rendered = (
+            (renderers[0], release, content) for release, content in changelog
         )
+    else:
+        renderers = _get_changelog_renderers(option_dict)
+        max_releases, since = _get_changelog_limits(option_dict)
+        if git_dir is None:
+            git_dir = _get_git_directory()
+        # Only a ChangeLog of the whole history, written on its own, can be
+        # extended; other files, or limits, need the history to be walked.
+        incremental = (
+            len(renderers) == 1
+            and type(renderers[0]) is RSTChangeLogRenderer
+            and max_releases is None
+            and since is None
+        )
+        if git_dir and incremental and not _skip_history_cache():
+            snapshot = get_history_snapshot(git_dir)
+            if not snapshot.state.head:
+                snapshot = None
+        entries = _iter_log_oneline(git_dir=git_dir)
+        if not entries:
+            return
+        rendered = _iter_changelogs(
+            entries, renderers, get_tag_index(git_dir), max_releases, since
+        )
+
+    paths = {}
+    for renderer in renderers:
+        path = os.path.join(dest_dir, renderer.filename)
+        if os.path.exists(path) and not os.access(path, os.W_OK):
+            # If there's already a ChangeLog and it's not writable, just use
+            # it
+            log.info(
+                '[pbr] %s not written (file already'
+                ' exists and it is not writeable)' % renderer.filename
+            )
+            continue
+        paths[renderer] = path
+    if not paths:
         return
 
-    log.info('[pbr] Writing ChangeLog')
-    with io.open(new_changelog, "w", encoding="utf-8") as changelog_file:
-        for release, content in changelog:
-            changelog_file.write(content)
+    updated = None
+    if snapshot is not None and renderers[0] in paths:
+        updated = _update_changelog(snapshot, paths[renderers[0]])
+    if updated is not None:
+        rendered = [(renderers[0], None, updated)]
+        log.info('[pbr] Updating ChangeLog')
+    else:
+        log.info('[pbr] Writing ChangeLog')
+    digest = hashlib.sha1()
+    files = {}
+    try:
+        for renderer, path in paths.items():
+            files[renderer] = io.open(path, "w", encoding="utf-8")
+        for renderer, release, content in rendered:
+            if renderer in files:
+                files[renderer].write(content)
+                digest.update(content.encode('utf-8'))
+    finally:
+        for changelog_file in files.values():
+            changelog_file.close()
+    if snapshot is not None and renderers[0] in files:
+        _write_changelog_marker(
+            snapshot, paths[renderers[0]], digest.hexdigest()
+        )
     stop = time.time()
     log.info('[pbr] ChangeLog complete (%0.1fs)' % (stop - start))
 
 
+_ignore_emails_re = re.compile(
+    '((jenkins|zuul)@review|infra@lists|jenkins@openstack)'
+)
+
+
 def generate_authors(git_dir=None, dest_dir='.', option_dict=None):
     """Create AUTHORS file using git commits."""
     if option_dict is None:
@@ -319,28 +1582,21 @@ def generate_authors(git_dir=None, dest_dir='.', option_dict=None):
         return
 
     log.info('[pbr] Generating AUTHORS')
-    ignore_emails = '((jenkins|zuul)@review|infra@lists|jenkins@openstack)'
     if git_dir is None:
         git_dir = _get_git_directory()
     if git_dir:
-        authors = []
-
-        # don't include jenkins email address in AUTHORS file
-        git_log_cmd = ['log', '--format=%aN <%aE>']
-        authors += _run_git_command(git_log_cmd, git_dir).split('\n')
-        authors = [a for a in authors if not re.search(ignore_emails, a)]
-
-        # get all co-authors from commit messages
-        co_authors_out = _run_git_command('log', git_dir)
-        co_authors = re.findall(
-            'Co-authored-by:.+', co_authors_out, re.MULTILINE
-        )
-        co_authors = [
-            signed.split(":", 1)[1].strip() for signed in co_authors if signed
-        ]
-
-        authors += co_authors
-        authors = sorted(set(authors))
+        snapshot = get_history_snapshot(git_dir)
+
+        authors = set()
+        for commit in snapshot.commits:
+            # don't include jenkins email address in AUTHORS file
+            if commit.author not in authors and not _ignore_emails_re.search(
+                commit.author
+            ):
+                authors.add(commit.author)
+            # include the co-authors credited in commit messages
+            authors.update(commit.co_authors)
+        authors = sorted(authors)
 
         with open(new_authors, 'wb') as new_authors_fh:
             if os.path.exists(old_authors):
@@ -349,3 +1605,74 @@ def generate_authors(git_dir=None, dest_dir='.', option_dict=None):
             new_authors_fh.write(('\n'.join(authors) + '\n').encode('utf-8'))
     stop = time.time()
     log.info('[pbr] AUTHORS complete (%0.1fs)' % (stop - start))
+
+
+_version_module_template = (
+    version._VERSION_MODULE_HEADER
+    + '''
+# Don't edit it or commit it: it is rewritten whenever the package is built.
+package = %(package)r
+version = %(version)r
+git_sha = %(git_sha)r
+is_release = %(is_release)r
+'''
+)
+
+
+def _get_version_module_path(option_dict, dest_dir='.'):
+    """Return the path of the ``version_module`` option, if it is set."""
+    path = option_dict.get('version_module', (None, None))[1]
+    if not path:
+        return None
+    parts = path.strip().split('/')
+    if (
+        os.path.isabs(path)
+        or '..' in parts
+        or not parts[-1].endswith('.py')
+        or len(parts) < 2
+    ):
+        raise distutils.errors.DistutilsOptionError(
+            'version_module must be the path of a module in a package, '
+            'relative to setup.cfg, not %r' % path
+        )
+    return os.path.join(dest_dir, *parts)
+
+
+def write_version_module(
+    package, version, git_dir=None, dest_dir='.', option_dict=None
+):
+    """Write the version of the package to the ``version_module`` option.
+
+    The module holds the version, the git sha and whether it is a release,
+    so :class:`pbr.version.VersionInfo` doesn't have to look them up from the
+    installed metadata at runtime. It's only written from git: a tree
+    without one, such as an unpacked sdist, keeps the module it came with.
+    """
+    if option_dict is None:
+        option_dict = {}
+
+    path = _get_version_module_path(option_dict, dest_dir)
+    if path is None:
+        return
+    if git_dir is None:
+        git_dir = _run_git_functions()
+    if not git_dir:
+        return
+
+    git_sha = get_git_short_sha(git_dir)
+    is_release = get_is_release(git_dir)
+    content = _version_module_template % {
+        'package': str(package),
+        'version': str(version),
+        'git_sha': str(git_sha) if git_sha else None,
+        'is_release': bool(is_release),
+    }
+    try:
+        with io.open(path, 'r', encoding='utf-8') as version_module:
+            if version_module.read() == content:
+                return
+    except IOError:
+        pass
+    log.info('[pbr] Writing %s' % path)
+    with io.open(path, 'w', encoding='utf-8') as version_module:
+        version_module.write(content)
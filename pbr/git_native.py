@@ -0,0 +1,898 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""A minimal in-process reader for git repositories.
+
+Spawning git dominates the cost of answering simple questions about a
+repository, such as which commit is checked out. This module answers those
+questions by reading the on-disk repository format directly. It only
+understands the common cases: whenever it meets something it does not
+handle, it raises :class:`UnsupportedRepository` so that the caller can fall
+back to running git.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import binascii
+import bisect
+import collections
+import functools
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+
+class UnsupportedRepository(Exception):
+    """The repository uses something this reader does not handle."""
+
+
+# Environment variables that change where git looks for the repository, or
+# how it reads it.
+_UNSUPPORTED_ENVIRONMENT = (
+    'GIT_DIR',
+    'GIT_WORK_TREE',
+    'GIT_COMMON_DIR',
+    'GIT_OBJECT_DIRECTORY',
+    'GIT_ALTERNATE_OBJECT_DIRECTORIES',
+    'GIT_CEILING_DIRECTORIES',
+    'GIT_DISCOVERY_ACROSS_FILESYSTEM',
+    'GIT_CONFIG',
+    'GIT_CONFIG_GLOBAL',
+    'GIT_CONFIG_SYSTEM',
+    'GIT_CONFIG_COUNT',
+    'GIT_CONFIG_PARAMETERS',
+    'GIT_REPLACE_REF_BASE',
+    'GIT_INDEX_FILE',
+)
+
+# Configuration that changes how git presents refs and objects. This is
+# matched against the raw content of the configuration files, so it errs
+# on the side of falling back to git.
+_UNSUPPORTED_CONFIG = (
+    b'abbrev',
+    b'include',
+    b'objectformat',
+    b'refstorage',
+    b'replace',
+    b'graft',
+)
+
+# The minimum length of abbreviated object names, as in git.
+_MIN_ABBREV = 7
+
+# The number of candidate tags git describe considers by default.
+_MAX_DESCRIBE_CANDIDATES = 10
+
+# Walking the history in Python is slower than asking git to do it, so we
+# give up on describing commits that are very far from any tag.
+_MAX_DESCRIBE_WALK = 10000
+
+_OBJECT_TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+_OFS_DELTA = 6
+_REF_DELTA = 7
+
+# Errors that indicate a repository we can't read, e.g. a corrupt or
+# truncated file.
+_READ_ERRORS = (
+    EnvironmentError,
+    IndexError,
+    KeyError,
+    ValueError,
+    struct.error,
+    zlib.error,
+)
+
+_Commit = collections.namedtuple('_Commit', ['parents', 'date'])
+_Tag = collections.namedtuple('_Tag', ['object', 'type', 'name', 'date'])
+_Name = collections.namedtuple('_Name', ['path', 'sha', 'prio'])
+
+
+def _unsupported_on_error(func):
+    """Report unreadable repositories as UnsupportedRepository."""
+
+    @functools.wraps(func)
+    def _wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except _READ_ERRORS as e:
+            raise UnsupportedRepository('Unable to read repository: %s' % (e,))
+
+    return _wrapper
+
+
+def _check_environment():
+    for name in _UNSUPPORTED_ENVIRONMENT:
+        if os.environ.get(name):
+            raise UnsupportedRepository('%s is set' % name)
+
+
+def _check_config(paths, unsupported=_UNSUPPORTED_CONFIG):
+    for path in paths:
+        try:
+            with open(path, 'rb') as config_file:
+                content = config_file.read().lower()
+        except EnvironmentError:
+            continue
+        for option in unsupported:
+            if option in content:
+                raise UnsupportedRepository(
+                    '%s sets %s' % (path, option.decode('ascii'))
+                )
+
+
+def _get_global_config_paths():
+    home = os.path.expanduser('~')
+    xdg_config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(
+        home, '.config'
+    )
+    return [
+        '/etc/gitconfig',
+        '/usr/local/etc/gitconfig',
+        os.path.join(xdg_config_home, 'git', 'config'),
+        os.path.join(home, '.gitconfig'),
+    ]
+
+
+def find_executable(name):
+    """Find an executable on PATH without running it.
+
+    :return: The path to the executable, or None if it is not found.
+    """
+    try:
+        from shutil import which
+    except ImportError:  # Python 2
+        from distutils.spawn import find_executable as which
+
+    return which(name)
+
+
+def _is_git_dir(path):
+    if not os.path.isfile(os.path.join(path, 'HEAD')):
+        return False
+    if os.path.isfile(os.path.join(path, 'commondir')):
+        return True
+    return os.path.isdir(os.path.join(path, 'objects')) and os.path.isdir(
+        os.path.join(path, 'refs')
+    )
+
+
+def _read_gitfile(path):
+    with open(path, 'r') as gitfile:
+        content = gitfile.read().strip()
+    if not content.startswith('gitdir: '):
+        raise UnsupportedRepository('%s is not a gitfile' % path)
+    git_dir = content[len('gitdir: ') :]
+    return os.path.normpath(os.path.join(os.path.dirname(path), git_dir))
+
+
+def _check_ownership(path):
+    # git refuses to use repositories owned by someone else unless they are
+    # listed in safe.directory; let it decide what to do about those.
+    getuid = getattr(os, 'getuid', None)
+    if getuid is None or os.stat(path).st_uid != getuid():
+        raise UnsupportedRepository('%s is not owned by the user' % path)
+
+
+@_unsupported_on_error
+def find_git_dir(path=None):
+    """Find the git directory, as ``git rev-parse --git-dir`` would.
+
+    :param path: The directory to search from. Defaults to the current
+        working directory.
+    :return: The git directory, or None if path is not in a repository.
+    """
+    _check_environment()
+    start = os.path.abspath(path or os.curdir)
+    device = os.stat(start).st_dev
+    current = start
+    while True:
+        candidate = os.path.join(current, '.git')
+        if os.path.isdir(candidate):
+            git_dir = candidate
+            break
+        if os.path.isfile(candidate):
+            git_dir = _read_gitfile(candidate)
+            break
+        if _is_git_dir(current):
+            raise UnsupportedRepository('bare repositories are not supported')
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        if os.stat(parent).st_dev != device:
+            raise UnsupportedRepository('reached a filesystem boundary')
+        current = parent
+
+    if not _is_git_dir(git_dir):
+        raise UnsupportedRepository('%s is not a git directory' % git_dir)
+    _check_ownership(current)
+    if path is None and git_dir == os.path.join(start, '.git'):
+        # git uses a relative path when run from the top of the work tree
+        return '.git'
+    return git_dir
+
+
+def _byte_at(data, pos):
+    return bytearray(data[pos : pos + 1])[0]
+
+
+def _read_offset(data, pos):
+    """Read a big-endian base 128 number, as used for offsets and in indexes.
+
+    Unlike plain base 128 numbers, each continuation adds one, so that every
+    number has a single encoding.
+    """
+    byte = _byte_at(data, pos)
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = _byte_at(data, pos)
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return pos, value
+
+
+def _read_varint(data, pos):
+    """Read a little-endian base 128 number, as used in deltas."""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return pos, value
+
+
+def _apply_delta(base, delta):
+    delta = bytearray(delta)
+    pos, _ = _read_varint(delta, 0)
+    pos, size = _read_varint(delta, pos)
+    result = bytearray()
+    while pos < len(delta):
+        command = delta[pos]
+        pos += 1
+        if command & 0x80:
+            # copy from the base object
+            offset = 0
+            length = 0
+            for i in range(4):
+                if command & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if command & (0x10 << i):
+                    length |= delta[pos] << (8 * i)
+                    pos += 1
+            result += base[offset : offset + (length or 0x10000)]
+        elif command:
+            # insert new data
+            result += delta[pos : pos + command]
+            pos += command
+        else:
+            raise UnsupportedRepository('invalid delta instruction')
+    if len(result) != size:
+        raise UnsupportedRepository('delta produced the wrong size')
+    return bytes(result)
+
+
+def _inflate(data, pos, size):
+    """Decompress a zlib stream of known decompressed size from data."""
+    decompressor = zlib.decompressobj()
+    chunks = []
+    produced = 0
+    chunk_size = max(size, 4096)
+    while produced < size:
+        compressed = data[pos : pos + chunk_size]
+        if not compressed:
+            break
+        chunk = decompressor.decompress(compressed)
+        chunks.append(chunk)
+        produced += len(chunk)
+        if decompressor.unused_data:
+            break
+        pos += chunk_size
+    chunks.append(decompressor.flush())
+    result = b''.join(chunks)
+    if len(result) != size:
+        raise UnsupportedRepository('object has the wrong size')
+    return result
+
+
+def _map_file(path):
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _Pack(object):
+    """A pack file and its version 2 index."""
+
+    def __init__(self, index_path):
+        self._index = _map_file(index_path)
+        self._pack = None
+        try:
+            if self._index[:8] != b'\377tOc\x00\x00\x00\x02':
+                raise UnsupportedRepository(
+                    '%s is not a version 2 pack index' % index_path
+                )
+            self.count = self._fanout(255)
+            self._pack = _map_file(index_path[: -len('.idx')] + '.pack')
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """Unmap the pack and its index."""
+        self._index.close()
+        if self._pack is not None:
+            self._pack.close()
+
+    def _fanout(self, byte):
+        return struct.unpack_from('>I', self._index, 8 + byte * 4)[0]
+
+    def _name(self, i):
+        start = 1032 + i * 20
+        return self._index[start : start + 20]
+
+    def _bisect(self, binsha):
+        first = bytearray(binsha)[0]
+        lo = self._fanout(first - 1) if first else 0
+        hi = self._fanout(first)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name(mid) < binsha:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, binsha):
+        """Return the offset of an object in the pack, or None."""
+        i = self._bisect(binsha)
+        if i >= self.count or self._name(i) != binsha:
+            return None
+        offset = struct.unpack_from(
+            '>I', self._index, 1032 + self.count * 24 + i * 4
+        )[0]
+        if offset & 0x80000000:
+            offset = struct.unpack_from(
+                '>Q',
+                self._index,
+                1032 + self.count * 28 + (offset & 0x7FFFFFFF) * 8,
+            )[0]
+        return offset
+
+    def neighbours(self, binsha):
+        """Return the names sorting either side of binsha in the pack."""
+        i = self._bisect(binsha)
+        names = []
+        if i > 0:
+            names.append(self._name(i - 1))
+        if i < self.count and self._name(i) == binsha:
+            i += 1
+        if i < self.count:
+            names.append(self._name(i))
+        return names
+
+    def read(self, offset, repository):
+        """Return the (type, data) of the object at offset."""
+        data = self._pack
+        pos = offset
+        byte = _byte_at(data, pos)
+        pos += 1
+        type_number = (byte >> 4) & 7
+        size = byte & 0x0F
+        shift = 4
+        while byte & 0x80:
+            byte = _byte_at(data, pos)
+            pos += 1
+            size |= (byte & 0x7F) << shift
+            shift += 7
+
+        if type_number == _OFS_DELTA:
+            pos, distance = _read_offset(data, pos)
+            base_type, base = self.read(offset - distance, repository)
+        elif type_number == _REF_DELTA:
+            base_sha = binascii.hexlify(data[pos : pos + 20]).decode('ascii')
+            pos += 20
+            base_type, base = repository.read_object(base_sha)
+        elif type_number in _OBJECT_TYPES:
+            return _OBJECT_TYPES[type_number], _inflate(data, pos, size)
+        else:
+            raise UnsupportedRepository('unknown pack object type')
+        return base_type, _apply_delta(base, _inflate(data, pos, size))
+
+
+# The packs mapped by this process, by the path of their index, with the
+# identity of the index file they were mapped from. Packs are shared by all
+# the Repository instances, so that each is only mapped once.
+_packs = {}
+_packs_lock = threading.Lock()
+
+
+def _get_file_identity(path):
+    st = os.stat(path)
+    return (st.st_ino, st.st_size, st.st_mtime)
+
+
+def _get_packs(pack_dir):
+    """Return the packs in pack_dir, mapping only those not seen before.
+
+    Packs that are no longer in pack_dir, e.g. after a ``git gc``, are
+    unmapped.
+    """
+    try:
+        names = sorted(os.listdir(pack_dir))
+    except EnvironmentError:
+        names = []
+    paths = [os.path.join(pack_dir, name) for name in names]
+    packs = []
+    with _packs_lock:
+        for index_path in paths:
+            if not index_path.endswith('.idx'):
+                continue
+            identity = _get_file_identity(index_path)
+            cached = _packs.get(index_path)
+            if cached is None or cached[0] != identity:
+                if cached is not None:
+                    cached[1].close()
+                cached = (identity, _Pack(index_path))
+                _packs[index_path] = cached
+            packs.append(cached[1])
+        for index_path in list(_packs):
+            if (
+                os.path.dirname(index_path) == pack_dir
+                and index_path not in paths
+            ):
+                _packs.pop(index_path)[1].close()
+    return packs
+
+
+def _read_index_paths(index, version, count):
+    pos = 12
+    previous = b''
+    paths = []
+    try:
+        for _ in range(count):
+            start = pos
+            (mode,) = struct.unpack_from('>I', index, start + 24)
+            (flags,) = struct.unpack_from('>H', index, start + 60)
+            if mode & 0o170000 == 0o040000:
+                raise UnsupportedRepository('sparse indexes are not supported')
+            pos += 62
+            if version >= 3 and flags & 0x4000:
+                # extended flags
+                pos += 2
+            if version >= 4:
+                # The path is given as the number of bytes to remove from the
+                # end of the previous path, followed by the bytes to append.
+                pos, strip = _read_offset(index, pos)
+                end = index.find(b'\x00', pos)
+                path = previous[: len(previous) - strip] + index[pos:end]
+                previous = path
+                pos = end + 1
+            else:
+                end = index.find(b'\x00', pos)
+                path = index[pos:end]
+                # entries are padded with NULs to a multiple of eight bytes
+                pos = start + ((pos - start + len(path) + 8) & ~7)
+            paths.append(path.decode('utf-8', 'replace'))
+    except _READ_ERRORS as e:
+        raise UnsupportedRepository('Unable to read index: %s' % (e,))
+    return paths
+
+
+def _common_prefix_length(a, b):
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+def _check_sha(sha, what):
+    if len(sha) != 40:
+        raise UnsupportedRepository('%s is not a SHA-1 object name' % what)
+    return sha
+
+
+class Repository(object):
+    """Read access to the refs and objects of a git repository.
+
+    :param git_dir: The git directory, as given by :func:`find_git_dir`.
+    :raises UnsupportedRepository: If the repository uses features that
+        this reader does not handle.
+    """
+
+    @_unsupported_on_error
+    def __init__(self, git_dir):
+        _check_environment()
+        self.git_dir = git_dir
+        self.common_dir = git_dir
+        commondir_path = os.path.join(git_dir, 'commondir')
+        if os.path.exists(commondir_path):
+            with open(commondir_path, 'r') as commondir_file:
+                self.common_dir = os.path.normpath(
+                    os.path.join(git_dir, commondir_file.read().strip())
+                )
+        self.objects_dir = os.path.join(self.common_dir, 'objects')
+        for path, feature in (
+            (os.path.join(self.common_dir, 'shallow'), 'shallow clones'),
+            (os.path.join(self.common_dir, 'info', 'grafts'), 'grafts'),
+            (os.path.join(self.common_dir, 'reftable'), 'reftables'),
+            (os.path.join(self.common_dir, 'refs', 'replace'), 'replaces'),
+            (
+                os.path.join(self.objects_dir, 'info', 'alternates'),
+                'alternates',
+            ),
+        ):
+            if os.path.exists(path):
+                raise UnsupportedRepository('%s are not supported' % feature)
+        _check_config(
+            _get_global_config_paths()
+            + [
+                os.path.join(self.common_dir, 'config'),
+                os.path.join(git_dir, 'config.worktree'),
+            ]
+        )
+        self._packs = None
+        self._packed_refs = None
+
+    def _get_packs(self):
+        if self._packs is None:
+            self._packs = _get_packs(os.path.join(self.objects_dir, 'pack'))
+        return self._packs
+
+    def _get_packed_refs(self):
+        """Return the packed refs and their peeled values, if known.
+
+        :return: A (refs, peeled) tuple of dicts mapping refnames to object
+            names. peeled is None if the packed refs are not peeled.
+        """
+        if self._packed_refs is None:
+            refs = {}
+            peeled = None
+            last = None
+            path = os.path.join(self.common_dir, 'packed-refs')
+            try:
+                with open(path, 'rb') as packed_refs:
+                    lines = packed_refs.read().decode('utf-8').splitlines()
+            except EnvironmentError:
+                lines = []
+            for line in lines:
+                if line.startswith('# pack-refs with:'):
+                    if ' peeled' in line or 'fully-peeled' in line:
+                        peeled = {}
+                elif line.startswith('^'):
+                    if peeled is not None:
+                        peeled[last] = _check_sha(line[1:], last)
+                elif line:
+                    sha, last = line.split(' ', 1)
+                    if last.startswith('refs/replace/'):
+                        raise UnsupportedRepository(
+                            'replaces are not supported'
+                        )
+                    refs[last] = _check_sha(sha, last)
+            self._packed_refs = (refs, peeled)
+        return self._packed_refs
+
+    def _read_loose_ref(self, ref):
+        path = os.path.join(self.common_dir, *ref.split('/'))
+        try:
+            with open(path, 'r') as ref_file:
+                value = ref_file.read().strip()
+        except EnvironmentError:
+            return None
+        if value.startswith('ref: '):
+            raise UnsupportedRepository('%s is a symbolic ref' % ref)
+        return _check_sha(value, ref)
+
+    @_unsupported_on_error
+    def read_ref(self, ref):
+        """Return the object name a ref points to, or None."""
+        sha = self._read_loose_ref(ref)
+        if sha is None:
+            sha = self._get_packed_refs()[0].get(ref)
+        return sha
+
+    @_unsupported_on_error
+    def read_head(self):
+        """Return the object name of the commit HEAD points to."""
+        with open(os.path.join(self.git_dir, 'HEAD'), 'r') as head_file:
+            head = head_file.read().strip()
+        if head.startswith('ref: '):
+            ref = head[len('ref: ') :]
+            head = self.read_ref(ref)
+            if head is None:
+                raise UnsupportedRepository('%s does not exist yet' % ref)
+        return _check_sha(head, 'HEAD')
+
+    @_unsupported_on_error
+    def read_tags(self):
+        """Return a dict of the tag names and the object names they refer to."""
+        tags = dict(
+            (ref[len('refs/tags/') :], sha)
+            for ref, sha in self._get_packed_refs()[0].items()
+            if ref.startswith('refs/tags/')
+        )
+        tags_dir = os.path.join(self.common_dir, 'refs', 'tags')
+        for dirpath, dirnames, filenames in os.walk(tags_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, tags_dir).replace(os.sep, '/')
+                sha = self._read_loose_ref('refs/tags/' + name)
+                if sha is not None:
+                    tags[name] = sha
+        return tags
+
+    @_unsupported_on_error
+    def read_index_paths(self):
+        """Return the paths in the index, as ``git ls-files`` would.
+
+        The whole index is read before any path is returned, so that an
+        unsupported or unreadable index is always reported to the caller.
+        """
+        path = os.path.join(self.git_dir, 'index')
+        if not os.path.exists(path):
+            return []
+        if any(
+            name.startswith('sharedindex.')
+            for name in os.listdir(self.git_dir)
+        ):
+            raise UnsupportedRepository('split indexes are not supported')
+        _check_config(
+            [
+                os.path.join(self.common_dir, 'config'),
+                os.path.join(self.git_dir, 'config.worktree'),
+            ],
+            unsupported=(b'sparse',),
+        )
+        with open(path, 'rb') as index_file:
+            index = index_file.read()
+        signature, version, count = struct.unpack_from('>4sII', index, 0)
+        if signature != b'DIRC' or version not in (2, 3, 4):
+            raise UnsupportedRepository('unsupported index format')
+        return _read_index_paths(index, version, count)
+
+    @_unsupported_on_error
+    def read_object(self, sha):
+        """Return the type and the content of an object."""
+        path = os.path.join(self.objects_dir, sha[:2], sha[2:])
+        if os.path.exists(path):
+            with open(path, 'rb') as object_file:
+                data = zlib.decompress(object_file.read())
+            header, _, content = data.partition(b'\x00')
+            object_type, size = header.decode('ascii').split(' ')
+            if len(content) != int(size):
+                raise UnsupportedRepository('object %s is corrupt' % sha)
+            return object_type, content
+
+        binsha = binascii.unhexlify(sha)
+        for pack in self._get_packs():
+            offset = pack.find(binsha)
+            if offset is not None:
+                return pack.read(offset, self)
+        raise UnsupportedRepository('object %s not found' % sha)
+
+    def read_commit(self, sha):
+        """Return the parents and committer date of a commit."""
+        object_type, data = self.read_object(sha)
+        if object_type != 'commit':
+            raise UnsupportedRepository('%s is not a commit' % sha)
+        parents = []
+        date = 0
+        for line in data.split(b'\n'):
+            if not line:
+                break
+            if line.startswith(b'parent '):
+                parents.append(line[len(b'parent ') :].decode('ascii'))
+            elif line.startswith(b'committer '):
+                date = int(line.rsplit(b' ', 2)[1])
+        return _Commit(tuple(parents), date)
+
+    def read_tag(self, sha):
+        """Return the target, tag name and tagger date of a tag object."""
+        object_type, data = self.read_object(sha)
+        if object_type != 'tag':
+            raise UnsupportedRepository('%s is not a tag' % sha)
+        fields = {}
+        for line in data.split(b'\n'):
+            if not line:
+                break
+            key, _, value = line.decode('utf-8', 'replace').partition(' ')
+            fields.setdefault(key, value)
+        date = 0
+        if 'tagger' in fields:
+            date = int(fields['tagger'].rsplit(' ', 2)[1])
+        return _Tag(fields['object'], fields['type'], fields['tag'], date)
+
+    def _peel(self, sha):
+        """Follow a chain of tag objects to the object it refers to."""
+        object_type = 'tag'
+        while object_type == 'tag':
+            object_type, _ = self.read_object(sha)
+            if object_type == 'tag':
+                tag = self.read_tag(sha)
+                sha, object_type = tag.object, tag.type
+        return sha
+
+    @_unsupported_on_error
+    def abbreviate(self, sha):
+        """Return the abbreviated object name git would use for sha."""
+        packs = self._get_packs()
+        # Like git, scale the default length with the size of the
+        # repository, as approximated by the number of packed objects.
+        count = sum(pack.count for pack in packs)
+        bits = max(count.bit_length() - 1, 0) + 1
+        length = max(_MIN_ABBREV, (bits + 1) // 2)
+
+        # Then make sure the abbreviation is unambiguous.
+        binsha = binascii.unhexlify(sha)
+        common = 0
+        for pack in packs:
+            for name in pack.neighbours(binsha):
+                hex_name = binascii.hexlify(name).decode('ascii')
+                common = max(common, _common_prefix_length(sha, hex_name))
+        try:
+            loose = os.listdir(os.path.join(self.objects_dir, sha[:2]))
+        except EnvironmentError:
+            loose = []
+        for name in loose:
+            if name != sha[2:]:
+                common = max(common, 2 + _common_prefix_length(sha[2:], name))
+        return sha[: max(length, common + 1)]
+
+    @_unsupported_on_error
+    def read_peeled_tags(self):
+        """Return the tags and the objects they ultimately refer to.
+
+        :return: A list of (name, object name, peeled object name) tuples,
+            sorted by name. The peeled object name differs from the object
+            name only for annotated tags.
+        """
+        packed_refs, packed_peeled = self._get_packed_refs()
+        tags = []
+        for name, sha in sorted(self.read_tags().items()):
+            ref = 'refs/tags/' + name
+            if packed_peeled is not None and packed_refs.get(ref) == sha:
+                peeled = packed_peeled.get(ref, sha)
+            else:
+                peeled = self._peel(sha)
+            tags.append((name, sha, peeled))
+        return tags
+
+    def _get_commit_names(self):
+        """Map commits to the tag git describe would name them after."""
+        names = {}
+        dates = {}
+
+        def _get_date(sha):
+            if sha not in dates:
+                dates[sha] = self.read_tag(sha).date
+            return dates[sha]
+
+        for name, sha, peeled in self.read_peeled_tags():
+            prio = 2 if peeled != sha else 1
+            current = names.get(peeled)
+            if current is None or current.prio < prio:
+                names[peeled] = _Name(name, sha, prio)
+            elif current.prio == 2 and prio == 2:
+                # Multiple annotated tags, prefer the newest.
+                if _get_date(current.sha) < _get_date(sha):
+                    names[peeled] = _Name(name, sha, prio)
+        return names
+
+    def _format_name(self, name, depth, head, exact):
+        # Like git, use the name from the tag object, and always use the long
+        # format if it doesn't match the name of the ref.
+        tag_name = self.read_tag(name.sha).name
+        if exact and tag_name == name.path:
+            return tag_name
+        return '%s-%d-g%s' % (tag_name, depth, self.abbreviate(head))
+
+    @_unsupported_on_error
+    def describe(self):
+        """Describe HEAD as ``git describe --always`` would."""
+        head = self.read_head()
+        names = self._get_commit_names()
+
+        name = names.get(head)
+        if name is not None and name.prio == 2:
+            return self._format_name(name, 0, head, exact=True)
+
+        # This follows the search in git's builtin/describe.c: walk the
+        # history by date, noting the first few annotated tags found and
+        # how many commits are not reachable from each of them.
+        seen = 1
+        flags = {head: 1}
+        queue = []
+        dates = []
+        commits = {}
+        candidates = []
+        gave_up_on = None
+
+        def _insert_by_date(sha):
+            commit = commits.get(sha)
+            if commit is None:
+                commit = commits[sha] = self.read_commit(sha)
+            # Keep the queue newest first, after any commits of equal date.
+            i = bisect.bisect_right(dates, -commit.date)
+            dates.insert(i, -commit.date)
+            queue.insert(i, sha)
+
+        def _pop():
+            dates.pop(0)
+            return queue.pop(0)
+
+        commits[head] = self.read_commit(head)
+        sha = head
+        while sha is not None:
+            if seen > _MAX_DESCRIBE_WALK:
+                raise UnsupportedRepository('too far from a tag to describe')
+            name = names.get(sha)
+            if name is not None and name.prio == 2:
+                if len(candidates) < _MAX_DESCRIBE_CANDIDATES:
+                    flag = 1 << (len(candidates) + 1)
+                    candidates.append([seen - 1, len(candidates), name, flag])
+                    flags[sha] |= flag
+                else:
+                    gave_up_on = sha
+                    break
+            for candidate in candidates:
+                if not flags[sha] & candidate[3]:
+                    candidate[0] += 1
+            if candidates and not queue:
+                best_depth = min(candidate[0] for candidate in candidates)
+                best_within = 0
+                for candidate in candidates:
+                    if candidate[0] == best_depth:
+                        best_within |= candidate[3]
+                if flags[sha] & best_within == best_within:
+                    break
+            for parent in commits[sha].parents:
+                if parent not in flags:
+                    flags[parent] = 0
+                    _insert_by_date(parent)
+                flags[parent] |= flags[sha]
+            if queue:
+                sha = _pop()
+                seen += 1
+            else:
+                sha = None
+
+        if not candidates:
+            return self.abbreviate(head)
+
+        candidates.sort(key=lambda candidate: candidate[:2])
+        best = candidates[0]
+
+        # Finish counting the commits not reachable from the best candidate.
+        if gave_up_on is not None:
+            _insert_by_date(gave_up_on)
+        while queue:
+            sha = _pop()
+            if flags[sha] & best[3]:
+                if all(flags[other] & best[3] for other in queue):
+                    break
+            else:
+                best[0] += 1
+            for parent in commits[sha].parents:
+                if parent not in flags:
+                    flags[parent] = 0
+                    _insert_by_date(parent)
+                flags[parent] |= flags[sha]
+
+        return self._format_name(best[2], best[0], head, exact=False)
@@ -22,10 +22,93 @@ from pbr.hooks import files
 from pbr.hooks import metadata
 
 
-def setup_hook(config):
-    """Filter config parsed from a setup.cfg to inject our defaults."""
-    metadata_config = metadata.MetadataConfig(config)
+# The metadata computed by the hooks which isn't needed by every command.
+ALL_METADATA = frozenset(['version', 'requirements', 'files'])
+
+# The options which make setup.py print some metadata instead of running any
+# command, and whether they need the version to do so.
+_DISPLAY_OPTIONS = {
+    '--help-commands': False,
+    '--name': False,
+    '--version': True,
+    '-V': True,
+    '--fullname': True,
+    '--author': False,
+    '--author-email': False,
+    '--maintainer': False,
+    '--maintainer-email': False,
+    '--contact': False,
+    '--contact-email': False,
+    '--url': False,
+    '--license': False,
+    '--licence': False,
+    '--description': False,
+    '--long-description': False,
+    '--platforms': False,
+    '--classifiers': False,
+    '--keywords': False,
+    '--provides': False,
+    '--requires': False,
+    '--obsoletes': False,
+}
+
+# The global options which don't take a value.
+_GLOBAL_FLAGS = frozenset(
+    ['-v', '--verbose', '-q', '--quiet', '-n', '--dry-run', '--no-user-cfg']
+)
+
+# The commands that need neither the version nor the requirements, and the
+# options they take, none of which take a value. The version commands
+# compute the version themselves.
+_LIGHT_COMMANDS = {
+    'clean': frozenset(['-a', '--all']),
+    'rpm_version': frozenset(),
+    'deb_version': frozenset(),
+}
+
+
+def get_needed_metadata(script_args):
+    """Return the metadata which setup.py needs for script_args.
+
+    This is the subset of :data:`ALL_METADATA` that the commands or display
+    options in script_args use. Anything that isn't known to need less, or
+    no script_args at all, needs everything.
+    """
+    if not script_args:
+        return ALL_METADATA
+    needed = set()
+    command = None
+    for arg in script_args:
+        if arg in ('-h', '--help') or arg in _GLOBAL_FLAGS:
+            continue
+        if command is None and arg in _DISPLAY_OPTIONS:
+            if _DISPLAY_OPTIONS[arg]:
+                needed.add('version')
+        elif arg in _LIGHT_COMMANDS:
+            command = arg
+            # setuptools looks for packages itself before running a command
+            # if it isn't given any.
+            needed.add('files')
+        elif command is None or arg not in _LIGHT_COMMANDS[command]:
+            return ALL_METADATA
+    return frozenset(needed)
+
+
+def setup_hook(config, script_args=None):
+    """Filter config parsed from a setup.cfg to inject our defaults.
+
+    Only the metadata needed by script_args, the arguments setup.py was
+    called with, is computed; see :func:`get_needed_metadata`.
+    """
+    needed = get_needed_metadata(script_args)
+    metadata_config = metadata.MetadataConfig(
+        config,
+        version='version' in needed,
+        requirements='requirements' in needed,
+    )
     metadata_config.run()
-    backwards.BackwardsCompatConfig(config).run()
+    if 'requirements' in needed:
+        backwards.BackwardsCompatConfig(config).run()
     commands.CommandsConfig(config).run()
-    files.FilesConfig(config, metadata_config.get_name()).run()
+    if 'files' in needed:
+        files.FilesConfig(config, metadata_config.get_name()).run()
@@ -54,6 +54,25 @@ def unquote_path(path):
     return "".join(shlex.split(path))
 
 
+def _parse_glob(line):
+    """Return the (target, source prefix) of a data_files glob line.
+
+    A glob line looks like ``target = source/*``; any other line gives None.
+    """
+    if line.rstrip().endswith('*') and '=' in line:
+        (target, source_glob) = line.split('=')
+        return target.strip(), source_glob.strip()[:-1]
+    return None
+
+
+def iter_glob_sources(data_files):
+    """Iterate over the directories the data_files globs are expanded from."""
+    for line in data_files.split("\n"):
+        glob = _parse_glob(line)
+        if glob:
+            yield unquote_path(glob[1])
+
+
 class FilesConfig(base.BaseConfig):
 
     section = 'files'
@@ -70,10 +89,9 @@ class FilesConfig(base.BaseConfig):
     def expand_globs(self):
         finished = []
         for line in self.data_files.split("\n"):
-            if line.rstrip().endswith('*') and '=' in line:
-                (target, source_glob) = line.split('=')
-                source_prefix = source_glob.strip()[:-1]
-                target = target.strip()
+            glob = _parse_glob(line)
+            if glob:
+                (target, source_prefix) = glob
                 if not target.endswith(os.path.sep):
                     target += os.path.sep
                 unquoted_prefix = unquote_path(source_prefix)
@@ -24,16 +24,23 @@ class MetadataConfig(base.BaseConfig):
 
     section = 'metadata'
 
+    def __init__(self, config, version=True, requirements=True):
+        super(MetadataConfig, self).__init__(config)
+        self.version = version
+        self.requirements = requirements
+
     def hook(self):
-        self.config['version'] = packaging.get_version(
-            self.config['name'], self.config.get('version', None)
-        )
-        # NOTE(stephenfin): While we are appending this to '[metadata]
-        # requires_dist' here, we immediately transform that to
-        # 'install_requires' when parsing 'setup.cfg'
-        packaging.append_text_list(
-            self.config, 'requires_dist', packaging.parse_requirements()
-        )
+        if self.version:
+            self.config['version'] = packaging.get_version(
+                self.config['name'], self.config.get('version', None)
+            )
+        if self.requirements:
+            # NOTE(stephenfin): While we are appending this to '[metadata]
+            # requires_dist' here, we immediately transform that to
+            # 'install_requires' when parsing 'setup.cfg'
+            packaging.append_text_list(
+                self.config, 'requires_dist', packaging.parse_requirements()
+            )
 
     def get_name(self):
         return self.config['name']
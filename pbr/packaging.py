@@ -22,6 +22,7 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import collections
 import email
 import email.errors
 import os
@@ -29,6 +30,7 @@ import re
 import sys
 import warnings
 
+from distutils import errors
 from distutils import log
 
 from pbr._compat.five import urlparse
@@ -71,8 +73,8 @@ def _any_existing(file_list):
     return [f for f in file_list if os.path.exists(f)]
 
 
-# Get requirements from the first file that exists
-def get_reqs_from_files(requirements_files):
+def _get_requirements_file(requirements_files):
+    """Return the first of requirements_files that exists, if any."""
     existing = _any_existing(requirements_files)
 
     # TODO(stephenfin): Remove this in pbr 6.0+
@@ -87,95 +89,228 @@ def get_reqs_from_files(requirements_files):
         )
 
     existing = [f for f in existing if f not in PY_REQUIREMENTS_FILES]
-    for requirements_file in existing:
-        with open(requirements_file, 'r') as fil:
-            return fil.read().split('\n')
+    if existing:
+        return existing[0]
+    return None
 
-    return []
+
+# Get requirements from the first file that exists
+def get_reqs_from_files(requirements_files):
+    requirements_file = _get_requirements_file(requirements_files)
+    if requirements_file is None:
+        return []
+    with open(requirements_file, 'r') as fil:
+        return fil.read().split('\n')
+
+
+_egg_version_re = re.compile(
+    r'(?P<PackageName>[\w.-]+)-'
+    r'(?P<GlobalVersion>'
+    r'(?P<VersionTripple>'
+    r'(?P<Major>0|[1-9][0-9]*)\.'
+    r'(?P<Minor>0|[1-9][0-9]*)\.'
+    r'(?P<Patch>0|[1-9][0-9]*)){1}'
+    r'(?P<Tags>(?:\-'
+    r'(?P<Prerelease>(?:(?=[0]{1}[0-9A-Za-z-]{0})(?:[0]{1})|'
+    r'(?=[1-9]{1}[0-9]*[A-Za-z]{0})(?:[0-9]+)|'
+    r'(?=[0-9]*[A-Za-z-]+[0-9A-Za-z-]*)(?:[0-9A-Za-z-]+)){1}'
+    r'(?:\.(?=[0]{1}[0-9A-Za-z-]{0})(?:[0]{1})|'
+    r'\.(?=[1-9]{1}[0-9]*[A-Za-z]{0})(?:[0-9]+)|'
+    r'\.(?=[0-9]*[A-Za-z-]+[0-9A-Za-z-]*)'
+    r'(?:[0-9A-Za-z-]+))*){1}){0,1}(?:\+'
+    r'(?P<Meta>(?:[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))){0,1}))'
+)
 
 
 def egg_fragment(match):
-    return re.sub(
-        r'(?P<PackageName>[\w.-]+)-'
-        r'(?P<GlobalVersion>'
-        r'(?P<VersionTripple>'
-        r'(?P<Major>0|[1-9][0-9]*)\.'
-        r'(?P<Minor>0|[1-9][0-9]*)\.'
-        r'(?P<Patch>0|[1-9][0-9]*)){1}'
-        r'(?P<Tags>(?:\-'
-        r'(?P<Prerelease>(?:(?=[0]{1}[0-9A-Za-z-]{0})(?:[0]{1})|'
-        r'(?=[1-9]{1}[0-9]*[A-Za-z]{0})(?:[0-9]+)|'
-        r'(?=[0-9]*[A-Za-z-]+[0-9A-Za-z-]*)(?:[0-9A-Za-z-]+)){1}'
-        r'(?:\.(?=[0]{1}[0-9A-Za-z-]{0})(?:[0]{1})|'
-        r'\.(?=[1-9]{1}[0-9]*[A-Za-z]{0})(?:[0-9]+)|'
-        r'\.(?=[0-9]*[A-Za-z-]+[0-9A-Za-z-]*)'
-        r'(?:[0-9A-Za-z-]+))*){1}){0,1}(?:\+'
-        r'(?P<Meta>(?:[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))){0,1}))',
-        r'\g<PackageName>>=\g<GlobalVersion>',
-        match.groups()[-1],
+    return _egg_version_re.sub(
+        r'\g<PackageName>>=\g<GlobalVersion>', match.groups()[-1]
     )
 
 
-def parse_requirements(requirements_files=None, strip_markers=False):
-    if requirements_files is None:
-        requirements_files = get_requirements_files()
+_egg_re = re.compile(r'egg=([^&]+).*$')
+
+# Classifies a line of a requirements file by its start, so that each line
+# is only scanned once. Lines which match none of the groups are plain
+# requirements.
+_requirement_line_re = re.compile(
+    r"""
+    (?P<comment>\s*(?:\#|$))
+    | (?P<index>\s*(?:-i|--index-url|--extra-index-url|--find-links))
+    | (?P<include>-r)
+    | (?P<editable>\s*-e\s+)
+    | (?P<find_links>\s*-f\s+)
+    | (?P<link>\s*(?:https?|git(?:\+(?:https|ssh))?|svn|hg)\S*:)
+    | (?P<url>\s*[A-Za-z][A-Za-z0-9+.-]*:)
+    """,
+    re.VERBOSE,
+)
+
+_dependency_flag_re = re.compile(r'\s*-[ef]\s+')
+
+
+# A line of a requirements file. requirement is the line as it is passed to
+# setuptools, include the file named by a -r line, exclusion why a line that
+# names a project is not a requirement, and dependency_link the location the
+# line gives for a package, if any.
+_RequirementLine = collections.namedtuple(
+    '_RequirementLine',
+    ['requirement', 'include', 'exclusion', 'dependency_link'],
+)
+
+# The parsed lines of each requirements file read by this process, with the
+# status of the file when it was read.
+_parsed_requirements = {}
+
+
+def _parse_requirement_line(line):
+    match = _requirement_line_re.match(line)
+    kind = match.lastgroup if match else None
+
+    # Ignore comments, blank lines and index URL lines
+    if kind in ('comment', 'index'):
+        return _RequirementLine(None, None, None, None)
+
+    # Handle nested requirements files such as:
+    # -r other-requirements.txt
+    if kind == 'include':
+        return _RequirementLine(None, line.partition(' ')[2], None, None)
+
+    # -f lines are for index locations, and don't get used here, but they
+    # give the location of packages, as -e lines do
+    if kind == 'find_links':
+        exclusion = '%s: %s' % (
+            pbr._compat.packaging.extract_project_name(line),
+            'Index Location',
+        )
+        return _RequirementLine(
+            None, None, exclusion, _dependency_flag_re.sub('', line)
+        )
 
-    requirements = []
-    for line in get_reqs_from_files(requirements_files):
-        # Ignore comments
-        if (not line.strip()) or line.startswith('#'):
-            continue
+    requirement = line
+    dependency_link = None
+    if kind == 'editable':
+        requirement = line[match.end() :]
+        dependency_link = _dependency_flag_re.sub('', line)
+    elif kind == 'link':
+        # lines that are only urls can go in unmolested
+        dependency_link = line
+
+    # For the requirements list, we need to inject only the portion
+    # after egg= so that distutils knows the package it's looking for
+    # such as:
+    # -e git://github.com/openstack/nova/master#egg=nova
+    # -e git://github.com/openstack/nova/master#egg=nova-1.2.3
+    # -e git+https://foo.com/zipball#egg=bar&subdirectory=baz
+    # http://github.com/openstack/nova/zipball/master#egg=nova
+    # http://github.com/openstack/nova/zipball/master#egg=nova-1.2.3
+    # git+https://foo.com/zipball#egg=bar&subdirectory=baz
+    # git+[ssh]://github.com/openstack/nova/zipball/master#egg=nova-1.2.3
+    # hg+[ssh]://github.com/openstack/nova/zipball/master#egg=nova-1.2.3
+    # svn+[proto]://github.com/openstack/nova/zipball/master#egg=nova-1.2.3
+    if kind is not None:
+        egg = urlparse(requirement)
+        if egg.scheme:
+            requirement = _egg_re.sub(egg_fragment, egg.fragment)
 
-        # Ignore index URL lines
-        if re.match(
-            r'^\s*(-i|--index-url|--extra-index-url|--find-links).*', line
-        ):
-            continue
+    requirement = requirement.partition('#')[0]
+    return _RequirementLine(requirement, None, None, dependency_link)
+
+
+def _get_parsed_requirements(requirements_file):
+    """Return the parsed lines of requirements_file.
+
+    Each file is only parsed once per process, unless it changes, so that
+    the different projections of it which are needed by the setup hooks do
+    not each have to read and parse it again.
+    """
+    path = os.path.abspath(requirements_file)
+    try:
+        st = os.stat(path)
+        status = (st.st_mtime, st.st_size, st.st_ino)
+    except OSError:
+        status = None
+    cached = _parsed_requirements.get(path)
+    if status is not None and cached is not None and cached[0] == status:
+        return cached[1]
+    with open(requirements_file, 'r') as fil:
+        lines = tuple(
+            _parse_requirement_line(line) for line in fil.read().split('\n')
+        )
+    if status is not None:
+        _parsed_requirements[path] = (status, lines)
+    return lines
 
-        # Handle nested requirements files such as:
-        # -r other-requirements.txt
-        if line.startswith('-r'):
-            req_file = line.partition(' ')[2]
-            requirements += parse_requirements(
-                [req_file], strip_markers=strip_markers
+
+# A requirement, with the file and line it was read from.
+ResolvedRequirement = collections.namedtuple(
+    'ResolvedRequirement', ['requirement', 'filename', 'lineno']
+)
+
+
+def _resolve_requirements(requirements_file, resolved, stack):
+    path = os.path.abspath(requirements_file)
+    if path in stack:
+        cycle = stack[stack.index(path) :] + [path]
+        raise errors.DistutilsFileError(
+            'Requirements file %s includes itself: %s'
+            % (requirements_file, ' -> '.join(map(os.path.relpath, cycle)))
+        )
+    if path in resolved:
+        return resolved[path]
+
+    stack.append(path)
+    requirements = []
+    lines = _get_parsed_requirements(requirements_file)
+    for lineno, line in enumerate(lines, 1):
+        if line.include is not None:
+            include = _get_requirements_file([line.include])
+            if include is not None:
+                requirements += _resolve_requirements(include, resolved, stack)
+        elif line.requirement is not None:
+            requirements.append(
+                ResolvedRequirement(
+                    line.requirement, requirements_file, lineno
+                )
             )
-            continue
+        elif line.exclusion is not None:
+            log.info('[pbr] Excluding %s' % line.exclusion)
+    stack.pop()
+
+    resolved[path] = requirements
+    return requirements
+
+
+def resolve_requirements(requirements_files=None):
+    """Return the requirements of the first of requirements_files to exist.
+
+    The requirements of the files it includes with ``-r`` lines are given in
+    their place, and each is a :class:`ResolvedRequirement` recording where
+    it was read from. Every file is only resolved once, however many times
+    it is included.
+
+    :raises distutils.errors.DistutilsFileError: if a file includes itself,
+        directly or through other files.
+    """
+    if requirements_files is None:
+        requirements_files = get_requirements_files()
+
+    requirements_file = _get_requirements_file(requirements_files)
+    if requirements_file is None:
+        return []
+    return list(_resolve_requirements(requirements_file, {}, []))
 
-        project_name = pbr._compat.packaging.extract_project_name(line)
-
-        # For the requirements list, we need to inject only the portion
-        # after egg= so that distutils knows the package it's looking for
-        # such as:
-        # -e git://github.com/openstack/nova/master#egg=nova
-        # -e git://github.com/openstack/nova/master#egg=nova-1.2.3
-        # -e git+https://foo.com/zipball#egg=bar&subdirectory=baz
-        # http://github.com/openstack/nova/zipball/master#egg=nova
-        # http://github.com/openstack/nova/zipball/master#egg=nova-1.2.3
-        # git+https://foo.com/zipball#egg=bar&subdirectory=baz
-        # git+[ssh]://github.com/openstack/nova/zipball/master#egg=nova-1.2.3
-        # hg+[ssh]://github.com/openstack/nova/zipball/master#egg=nova-1.2.3
-        # svn+[proto]://github.com/openstack/nova/zipball/master#egg=nova-1.2.3
-        # -f lines are for index locations, and don't get used here
-        if re.match(r'\s*-e\s+', line):
-            extract = re.match(r'\s*-e\s+(.*)$', line)
-            line = extract.group(1)
-        egg = urlparse(line)
-        if egg.scheme:
-            line = re.sub(r'egg=([^&]+).*$', egg_fragment, egg.fragment)
-        elif re.match(r'\s*-f\s+', line):
-            line = None
-            reason = 'Index Location'
-
-        if line is not None:
-            line = re.sub('#.*$', '', line)
-            if strip_markers:
-                semi_pos = line.find(';')
-                if semi_pos < 0:
-                    semi_pos = None
-                line = line[:semi_pos]
-            requirements.append(line)
-        else:
-            log.info('[pbr] Excluding %s: %s' % (project_name, reason))
+
+def parse_requirements(requirements_files=None, strip_markers=False):
+    requirements = []
+    for resolved in resolve_requirements(requirements_files):
+        requirement = resolved.requirement
+        if strip_markers:
+            semi_pos = requirement.find(';')
+            if semi_pos < 0:
+                semi_pos = None
+            requirement = requirement[:semi_pos]
+        requirements.append(requirement)
 
     return requirements
 
@@ -184,20 +319,16 @@ def parse_dependency_links(requirements_files=None):
     if requirements_files is None:
         requirements_files = get_requirements_files()
 
-    dependency_links = []
+    requirements_file = _get_requirements_file(requirements_files)
+    if requirements_file is None:
+        return []
     # dependency_links inject alternate locations to find packages listed
     # in requirements
-    for line in get_reqs_from_files(requirements_files):
-        # skip comments and blank lines
-        if re.match(r'(\s*#)|(\s*$)', line):
-            continue
-        # lines with -e or -f need the whole line, minus the flag
-        if re.match(r'\s*-[ef]\s+', line):
-            dependency_links.append(re.sub(r'\s*-[ef]\s+', '', line))
-        # lines that are only urls can go in unmolested
-        elif re.match(r'^\s*(https?|git(\+(https|ssh))?|svn|hg)\S*:', line):
-            dependency_links.append(line)
-    return dependency_links
+    return [
+        line.dependency_link
+        for line in _get_parsed_requirements(requirements_file)
+        if line.dependency_link is not None
+    ]
 
 
 def _get_increment_kwargs(git_dir, tag):
@@ -209,25 +340,19 @@ def _get_increment_kwargs(git_dir, tag):
     :return: a dict of kwargs for passing into SemanticVersion.increment.
     """
     result = {}
-    if tag:
-        version_spec = tag + "..HEAD"
+    recent = git.get_recent_history(git_dir)
+    if tag and not git.get_tag_index(git_dir).has_name(tag):
+        # The tag is only known by its name with any - replaced by ., which
+        # git can't resolve, e.g. 1.2.3.rc2 for 1.2.3-rc2. Its Sem-Ver
+        # headers have always been ignored, so keep doing so.
+        symbols = set()
+    elif recent is not None and recent.tag == tag:
+        symbols = set(recent.semver_symbols)
     else:
-        version_spec = "HEAD"
-
-    # Get the raw body of the commit messages so that we don't have to
-    # parse out any formatting whitespace and to avoid user settings on
-    # git log output affecting out ability to have working sem ver headers.
-    changelog = git._run_git_command(
-        ['log', '--pretty=%B', version_spec], git_dir
-    )
-    symbols = set()
-    header = 'sem-ver:'
-    for line in changelog.split("\n"):
-        line = line.lower().strip()
-        if not line.lower().strip().startswith(header):
-            continue
-        new_symbols = line[len(header) :].strip().split(",")
-        symbols.update([symbol.strip() for symbol in new_symbols])
+        symbols = git.get_history_snapshot(git_dir).get_semver_symbols(tag)
+    if symbols is None:
+        # The tag is not one the snapshot knows about, so ask git directly.
+        symbols = git._read_semver_symbols([tag + "..HEAD"], git_dir)
 
     def _handle_symbol(symbol, symbols, impact):
         if symbol in symbols:
@@ -251,25 +376,12 @@ def _get_revno_and_last_tag(git_dir):
 
     We use git-describe to find this out, but if there are no
     tags then we fall back to counting commits since the beginning
-    of time.
+    of time. If describe can't tell, the whole history is walked.
     """
-    changelog = git._iter_log_oneline(git_dir=git_dir)
-    row_count = 0
-    for row_count, (ignored, tag_set, ignored) in enumerate(changelog):
-        version_tags = set()
-        semver_to_tag = {}
-        for tag in list(tag_set):
-            try:
-                semver = version.SemanticVersion.from_pip_string(tag)
-                semver_to_tag[semver] = tag
-                version_tags.add(semver)
-            except Exception:
-                pass
-
-        if version_tags:
-            return semver_to_tag[max(version_tags)], row_count
-
-    return "", row_count
+    recent = git.get_recent_history(git_dir)
+    if recent is not None:
+        return recent.tag, recent.distance
+    return git.get_history_snapshot(git_dir).get_revno_and_last_tag()
 
 
 def _get_version_from_git_target(git_dir, target_version):
@@ -288,7 +400,10 @@ def _get_version_from_git_target(git_dir, target_version):
     :return: A semver version object.
     """
     tag, distance = _get_revno_and_last_tag(git_dir)
-    last_semver = version.SemanticVersion.from_pip_string(tag or '0')
+    if tag:
+        last_semver = git.get_tag_index(git_dir).get_semantic_version(tag)
+    else:
+        last_semver = version.SemanticVersion.from_pip_string('0')
     if distance == 0:
         new_version = last_semver
     else:
@@ -58,7 +58,9 @@ except ImportError:
     pass
 import logging  # noqa
 
+import hashlib
 import io
+import json
 import os
 import re
 import shlex
@@ -77,7 +79,11 @@ from pbr._compat.five import integer_types
 from pbr._compat.five import string_type
 from pbr._compat import packaging as packaging_compat
 from pbr import extra_files
+from pbr import git
 from pbr import hooks
+from pbr.hooks import files
+from pbr import options
+from pbr import packaging
 
 """Implementation of setup.cfg support."""
 
@@ -364,7 +370,7 @@ def setup_cfg_to_args(path='setup.cfg', script_args=None):
                     sys.exit(1)
 
         # Run the pbr hook
-        hooks.setup_hook(config)
+        _run_setup_hook(config, path, script_args)
 
         kwargs = setup_cfg_to_setup_kwargs(config, script_args)
 
@@ -400,6 +406,192 @@ def setup_cfg_to_args(path='setup.cfg', script_args=None):
     return kwargs
 
 
+# Bump this whenever the layout of the setup cache changes.
+_SETUP_CACHE_VERSION = 1
+
+
+def _skip_setup_cache(config):
+    value = config.get('pbr', {}).get('skip_setup_cache', '')
+    return (
+        value.lower() in options.TRUE_VALUES
+        or str(os.getenv('SKIP_SETUP_CACHE')).lower() in options.TRUE_VALUES
+    )
+
+
+def _get_setup_cache_path(path):
+    """Return the path of the setup cache of the setup.cfg at path."""
+    return os.path.join(
+        os.path.dirname(os.path.abspath(path)),
+        'build',
+        'pbr-cache',
+        'setup.json',
+    )
+
+
+def _iter_setup_hook_files():
+    """Iterate over the files the pbr setup hook may read.
+
+    These are the requirements files, including any files they include, and
+    the package metadata the version may be read from.
+    """
+    pending = list(packaging.get_requirements_files())
+    pending.extend(packaging.TEST_REQUIREMENTS_FILES)
+    seen = set()
+    while pending:
+        filename = pending.pop(0)
+        if filename in seen:
+            continue
+        seen.add(filename)
+        yield filename
+        try:
+            with open(filename, 'r') as requirements_file:
+                lines = requirements_file.read().split('\n')
+        except (IOError, OSError):
+            continue
+        for line in lines:
+            if line.startswith('-r'):
+                pending.append(line.partition(' ')[2])
+    for filename in ('PKG-INFO', 'METADATA'):
+        yield filename
+
+
+def _get_setup_cache_key(config, git_dir, cache_path):
+    """Return a digest of everything the pbr setup hook depends on.
+
+    These are the configuration, the files the hook reads, the code of pbr
+    itself, the environment, the state of the git repository, including
+    the names of any uncommitted files, and the files the data_files globs
+    match.
+
+    :raises TypeError: If the configuration can't be serialised.
+    """
+    digest = hashlib.sha1()
+
+    def _update(value):
+        if not isinstance(value, bytes):
+            value = value.encode('utf-8')
+        digest.update(value + b'\x00')
+
+    def _update_file(filename):
+        _update(filename)
+        try:
+            with open(filename, 'rb') as f:
+                _update(f.read())
+        except (IOError, OSError):
+            _update(b'')
+
+    _update(json.dumps(config, sort_keys=True))
+    _update(os.getcwd())
+    _update(sys.version)
+    _update(setuptools.__version__)
+    for name in sorted(os.environ):
+        if name.startswith(('PBR_', 'OSLO_', 'SKIP_')):
+            _update('%s=%s' % (name, os.environ[name]))
+    # pbr itself only changes when it is reinstalled or edited, which
+    # changes the size or modification time of its files; reading them all
+    # would cost more.
+    pbr_dir = os.path.dirname(os.path.abspath(__file__))
+    for dirpath, dirnames, filenames in os.walk(pbr_dir):
+        if dirpath == pbr_dir:
+            dirnames[:] = [name for name in dirnames if name != 'tests']
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                path = os.path.join(dirpath, filename)
+                st = os.stat(path)
+                _update('%s %r %d' % (path, st.st_mtime, st.st_size))
+    for filename in _iter_setup_hook_files():
+        _update_file(filename)
+    # The data_files globs are expanded from whatever is on disk, including
+    # files git ignores, such as generated ones.
+    data_files = config.get('files', {}).get('data_files', '')
+    for source in files.iter_glob_sources(data_files):
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames.sort()
+            _update(dirpath)
+            _update('\x00'.join(sorted(filenames)))
+    state = git._get_refs_state(git_dir)
+    _update(state.head or '')
+    _update(state.tags)
+    _update(
+        git._get_worktree_status(
+            exclude=os.path.relpath(os.path.dirname(cache_path))
+        )
+    )
+    return digest.hexdigest()
+
+
+def _read_setup_cache(cache_path, key):
+    """Return the config cached at cache_path for key, if there is one."""
+    try:
+        with open(cache_path, 'r') as cache_file:
+            data = json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return None
+    if data.get('version') != _SETUP_CACHE_VERSION or data.get('key') != key:
+        return None
+    return data['config']
+
+
+def _write_setup_cache(cache_path, key, config):
+    """Persist config so that later builds can reuse it."""
+    data = {'version': _SETUP_CACHE_VERSION, 'key': key, 'config': config}
+    try:
+        if not os.path.isdir(os.path.dirname(cache_path)):
+            os.makedirs(os.path.dirname(cache_path))
+        # Write to a temporary file first so that concurrent builds never
+        # see a partially written cache.
+        temp_path = '%s.%d' % (cache_path, os.getpid())
+        content = json.dumps(data)
+        with open(temp_path, 'w') as cache_file:
+            cache_file.write(content)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        os.rename(temp_path, cache_path)
+    except (IOError, OSError, TypeError, ValueError) as e:
+        log.info('[pbr] Unable to write setup cache: %s' % e)
+
+
+def _run_setup_hook(config, path, script_args=None):
+    """Run the pbr setup hook on config.
+
+    The hook computes the version, reads the requirements and finds the
+    packages, which each setup.py process would otherwise do again. In a
+    git repository, the resulting config is cached in the build directory
+    next to the setup.cfg at path, and reused for as long as nothing it
+    depends on changes; see :func:`_get_setup_cache_key`.
+
+    Commands that only need part of the metadata, according to
+    script_args, skip the cache, as checking it would cost more than
+    computing what they need.
+    """
+    git_dir = None
+    if hooks.get_needed_metadata(
+        script_args
+    ) == hooks.ALL_METADATA and not _skip_setup_cache(config):
+        git_dir = git._get_git_directory()
+    if not git_dir:
+        hooks.setup_hook(config, script_args)
+        return
+
+    cache_path = _get_setup_cache_path(path)
+    try:
+        key = _get_setup_cache_key(config, git_dir, cache_path)
+    except (TypeError, ValueError) as e:
+        # e.g. a custom setup hook put something in the config that can't
+        # be serialised.
+        log.info('[pbr] Not using the setup cache: %s' % e)
+        hooks.setup_hook(config, script_args)
+        return
+    cached = _read_setup_cache(cache_path, key)
+    if cached is not None:
+        config.clear()
+        config.update(cached)
+        return
+    hooks.setup_hook(config, script_args)
+    _write_setup_cache(cache_path, key, config)
+
+
 def _read_description_file(config):
     """Handle the legacy 'description_file' option."""
     long_description = has_get_option(config, 'metadata', 'long_description')
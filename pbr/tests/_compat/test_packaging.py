@@ -0,0 +1,57 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import fixtures
+import testtools
+
+from pbr._compat import packaging
+
+
+class TestEvaluateMarker(testtools.TestCase):
+
+    def setUp(self):
+        super(TestEvaluateMarker, self).setUp()
+        self.useFixture(fixtures.MockPatchObject(packaging, '_markers', {}))
+        self.useFixture(
+            fixtures.MockPatchObject(packaging, '_marker_results', {})
+        )
+        self.evaluate = self.useFixture(
+            fixtures.MockPatchObject(
+                packaging,
+                '_evaluate_marker',
+                side_effect=packaging._evaluate_marker,
+            )
+        ).mock
+
+    def test_cached(self):
+        self.assertTrue(packaging.evaluate_marker('python_version >= "2"'))
+        self.assertTrue(packaging.evaluate_marker('python_version >= "2"'))
+        self.assertFalse(packaging.evaluate_marker('python_version < "2"'))
+        self.assertEqual(2, self.evaluate.call_count)
+
+    def test_interpreter_changed(self):
+        packaging.evaluate_marker('sys_platform == "win32"')
+        self.useFixture(fixtures.MonkeyPatch('sys.platform', 'win32'))
+        packaging.evaluate_marker('sys_platform == "win32"')
+        self.assertEqual(2, self.evaluate.call_count)
+
+    def test_invalid(self):
+        self.assertRaises(
+            SyntaxError, packaging.evaluate_marker, 'python_version >='
+        )
+        self.assertRaises(
+            SyntaxError, packaging.evaluate_marker, 'python_version >='
+        )
+        self.assertEqual(2, self.evaluate.call_count)
@@ -50,6 +50,7 @@ import fixtures
 import testresources
 import testtools
 
+from pbr import git
 from pbr import options
 
 
@@ -77,6 +78,8 @@ class BaseTestCase(testtools.TestCase, testresources.ResourcedTestCase):
             stderr = self.useFixture(fixtures.StringStream('stderr')).stream
             self.useFixture(fixtures.MonkeyPatch('sys.stderr', stderr))
         self.log_fixture = self.useFixture(fixtures.FakeLogger('pbr'))
+        # Tests create repositories and fake git as they go.
+        self.addCleanup(git.invalidate_git_discovery)
 
         # Older git does not have config --local, so create a temporary home
         # directory to permit using git config --global without stepping on
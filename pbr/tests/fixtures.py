@@ -49,6 +49,7 @@ import fixtures
 from testtools import content
 import virtualenv
 
+from pbr import git
 from pbr.tests import util
 
 PBR_ROOT = os.path.abspath(os.path.join(__file__, '..', '..', '..'))
@@ -133,15 +134,19 @@ class GitRepo(fixtures.Fixture):
     def setUp(self):
         super(GitRepo, self).setUp()
         util.run_cmd(['git', 'init', '.'], self._basedir)
+        git.invalidate_git_discovery()
         util.config_git()
         util.run_cmd(['git', 'add', '.'], self._basedir)
 
-    def commit(self, message_content='test commit'):
+    def commit(self, message_content='test commit', author=None):
         files = len(os.listdir(self._basedir))
         path = self._basedir + '/%d' % files
         open(path, 'wt').close()
         util.run_cmd(['git', 'add', path], self._basedir)
-        util.run_cmd(['git', 'commit', '-m', message_content], self._basedir)
+        cmd = ['git', 'commit', '-m', message_content]
+        if author:
+            cmd.append('--author=%s' % author)
+        util.run_cmd(cmd, self._basedir)
 
     def uncommit(self):
         util.run_cmd(['git', 'reset', '--hard', 'HEAD^'], self._basedir)
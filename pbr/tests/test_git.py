@@ -17,15 +17,24 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
+import distutils.errors
+import io
+import json
 import os
 import sys
+import threading
 
 import fixtures
 
 from pbr._compat.five import BytesIO
 from pbr import git
+from pbr import git_native
 from pbr import options
+from pbr import packaging
 from pbr.tests import base
+from pbr.tests import fixtures as pbr_fixtures
+from pbr.tests import util
+from pbr import version
 
 if sys.version_info >= (3, 3):
     from unittest import mock
@@ -41,10 +50,92 @@ class TestGitIsInstalled(base.BaseTestCase):
             self.assertEqual(True, git._git_is_installed())
 
     def testGitIsNotInstalled(self):
+        self.useFixture(
+            fixtures.MonkeyPatch(
+                'pbr.git_native.find_executable', lambda name: None
+            )
+        )
         with mock.patch.object(git, '_run_shell_command') as _command:
             _command.side_effect = OSError
             self.assertEqual(False, git._git_is_installed())
 
+    def testGitIsInstalledOnPath(self):
+        self.useFixture(fixtures.EnvironmentVariable('PBR_NATIVE_GIT', '1'))
+        self.useFixture(
+            fixtures.MonkeyPatch(
+                'pbr.git_native.find_executable', lambda name: '/bin/git'
+            )
+        )
+        with mock.patch.object(git, '_run_shell_command') as _command:
+            self.assertEqual(True, git._git_is_installed())
+            self.assertFalse(_command.called)
+
+
+class TestGitDiscovery(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestGitDiscovery, self).setUp()
+        self.useFixture(fixtures.EnvironmentVariable('PBR_NATIVE_GIT', '1'))
+        self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.find_git_dir = self.useFixture(
+            fixtures.MockPatch(
+                'pbr.git_native.find_git_dir',
+                side_effect=git_native.find_git_dir,
+            )
+        ).mock
+
+    def test_discovered_once(self):
+        for _ in range(3):
+            self.assertEqual('.git', git._run_git_functions())
+        self.assertEqual(1, self.find_git_dir.call_count)
+
+    def test_invalidate(self):
+        git._run_git_functions()
+        git.invalidate_git_discovery()
+        git._run_git_functions()
+        self.assertEqual(2, self.find_git_dir.call_count)
+
+    def test_keyed_by_directory(self):
+        self.assertEqual('.git', git._get_git_directory())
+        os.chdir(self.useFixture(fixtures.TempDir()).path)
+        self.assertEqual('', git._get_git_directory())
+        os.chdir(self.package_dir)
+        self.assertEqual('.git', git._get_git_directory())
+        self.assertEqual(2, self.find_git_dir.call_count)
+
+    def test_keyed_by_git_environment(self):
+        git._get_git_directory()
+        self.useFixture(
+            fixtures.EnvironmentVariable('GIT_DIR', self.package_dir + '/.git')
+        )
+        for _ in range(2):
+            self.assertEqual(
+                self.package_dir + '/.git', git._get_git_directory()
+            )
+        self.assertEqual(2, self.find_git_dir.call_count)
+
+
+class TestIterShellCommand(base.BaseTestCase):
+
+    def test_records_split_across_chunks(self):
+        self.useFixture(fixtures.MonkeyPatch('pbr.git._STREAM_CHUNK_SIZE', 3))
+        cmd = [
+            sys.executable,
+            '-c',
+            'import sys; getattr(sys.stdout, "buffer", sys.stdout).write('
+            'b"foo\\x00\\xc3\\xa9t\\xc3\\xa9\\x00\\x00bar")',
+        ]
+        self.assertEqual(
+            [u'foo', u'\xe9t\xe9', u'', u'bar'],
+            list(git._iter_shell_command(cmd, b'\x00')),
+        )
+
+    def test_trailing_separator(self):
+        cmd = [sys.executable, '-c', 'print("foo"); print("bar")']
+        self.assertEqual(
+            [u'foo', u'bar'], list(git._iter_shell_command(cmd, b'\n'))
+        )
+
 
 class SkipFileWrites(base.BaseTestCase):
 
@@ -211,6 +302,22 @@ _old_git_changelog_content = '\n'.join(
 )
 
 
+def _make_log_records(changelog):
+    """Convert oneline changelog content to the records read by pbr"""
+
+    records = []
+    for line in changelog.split('\n'):
+        if not line.strip():
+            continue
+        sha, msg, refname = line.split('\x00')
+        records.append(
+            '\x00'.join(
+                (sha * 5, sha, '', 'Foo <foo@bar.com>', refname, msg, '')
+            )
+        )
+    return '\x00'.join(records) + '\x00'
+
+
 class GitLogsTest(base.BaseTestCase):
 
     scenarios = [
@@ -231,7 +338,11 @@ class GitLogsTest(base.BaseTestCase):
     def test_write_git_changelog(self):
         self.useFixture(
             fixtures.FakePopen(
-                lambda _: {"stdout": BytesIO(self.changelog.encode('utf-8'))}
+                lambda _: {
+                    "stdout": BytesIO(
+                        _make_log_records(self.changelog).encode('utf-8')
+                    )
+                }
             )
         )
 
@@ -264,47 +375,804 @@ class GitLogsTest(base.BaseTestCase):
     def test_generate_authors(self):
         author_old = u"Foo Foo <email@foo.com>"
         author_new = u"Bar Bar <email@bar.com>"
+        author_jenkins = u"Jenkins <jenkins@review.openstack.org>"
         co_author = u"Foo Bar <foo@bar.com>"
         co_author_by = u"Co-authored-by: " + co_author
 
-        git_log_cmd = (
-            "git --git-dir=%s log --format=%%aN <%%aE>" % self.git_dir
+        repo_dir = self.useFixture(fixtures.TempDir()).path
+        repo = self.useFixture(pbr_fixtures.GitRepo(repo_dir))
+        repo.commit(author=author_new)
+        repo.commit(author=author_jenkins)
+        repo.commit('Add a feature\n\n' + co_author_by)
+
+        with open(os.path.join(self.temp_path, "AUTHORS.in"), "w") as auth_fh:
+            auth_fh.write("%s\n" % author_old)
+
+        git.generate_authors(
+            git_dir=os.path.join(repo_dir, '.git'), dest_dir=self.temp_path
+        )
+
+        with open(os.path.join(self.temp_path, "AUTHORS"), "r") as auth_fh:
+            authors = auth_fh.read()
+            self.assertIn(author_old, authors)
+            self.assertIn(author_new, authors)
+            self.assertIn(co_author, authors)
+            self.assertNotIn(author_jenkins, authors)
+
+
+class _RecordedGitCommands(fixtures.Fixture):
+    """Record the git commands run by pbr.git, without altering them."""
+
+    def _setUp(self):
+        self.commands = []
+        for name in ('_run_git_command', '_iter_git_command'):
+            self.useFixture(
+                fixtures.MonkeyPatch(
+                    'pbr.git.' + name, self._record(getattr(git, name))
+                )
+            )
+
+    def _record(self, func):
+        def _recorded(cmd, *args, **kwargs):
+            self.commands.append(cmd)
+            return func(cmd, *args, **kwargs)
+
+        return _recorded
+
+
+class GitHistorySnapshotTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(GitHistorySnapshotTest, self).setUp()
+        self.repo = self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.useFixture(pbr_fixtures.GPGKey())
+        self.git_dir = os.path.join(self.package_dir, '.git')
+
+    def _count_log_commands(self):
+        commands = self.useFixture(_RecordedGitCommands()).commands
+        # Sem-Ver symbols are read separately from the history itself.
+        return lambda: len(
+            [
+                cmd
+                for cmd in commands
+                if cmd[0] == 'log' and '--grep=sem-ver:' not in cmd
+            ]
+        )
+
+    def test_history_read_once(self):
+        self.repo.commit()
+        self.repo.tag('1.2.3')
+        self.repo.commit('Sem-Ver: feature')
+        log_count = self._count_log_commands()
+
+        self.assertEqual(
+            ('1.2.3', 1),
+            git.get_history_snapshot(self.git_dir).get_revno_and_last_tag(),
+        )
+        self.assertEqual(
+            set(['feature']),
+            git.get_history_snapshot(self.git_dir).get_semver_symbols('1.2.3'),
+        )
+        self.assertEqual(2, len(list(git._iter_log_oneline(self.git_dir))))
+        self.assertEqual(
+            set([u'OpenStack Developer <example@example.com>']),
+            git.get_history_snapshot(self.git_dir).get_authors(),
         )
-        git_co_log_cmd = "git --git-dir=%s log" % self.git_dir
-        git_top_level = "git rev-parse --show-toplevel"
-        cmd_map = {
-            git_log_cmd: author_new,
-            git_co_log_cmd: co_author_by,
-            git_top_level: self.root_dir,
-        }
+        self.assertEqual(1, log_count())
 
-        exist_files = [
-            self.git_dir,
-            os.path.join(self.temp_path, "AUTHORS.in"),
+    def test_history_read_once_concurrently(self):
+        self.repo.commit()
+        log_count = self._count_log_commands()
+        snapshots = []
+
+        def _get_history_snapshot():
+            snapshots.append(git.get_history_snapshot(self.git_dir))
+
+        threads = [
+            threading.Thread(target=_get_history_snapshot) for _ in range(4)
         ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(4, len(snapshots))
+        self.assertEqual(1, len(set(snapshots)))
+        self.assertEqual(1, log_count())
+
+    def test_history_reread_on_change(self):
+        self.repo.commit()
+        log_count = self._count_log_commands()
+
+        def _get_revno_and_last_tag():
+            snapshot = git.get_history_snapshot(self.git_dir)
+            return snapshot.get_revno_and_last_tag()
+
+        self.assertEqual(('', 0), _get_revno_and_last_tag())
+        self.repo.tag('1.2.3')
+        self.assertEqual(('1.2.3', 0), _get_revno_and_last_tag())
+        self.repo.commit()
+        self.assertEqual(('1.2.3', 1), _get_revno_and_last_tag())
+        self.assertEqual(3, log_count())
+
+    def test_semver_symbols_since_prerelease_tag(self):
+        self.repo.commit('Sem-Ver: api-break')
+        self.repo.tag('1.2.3-rc2')
+        self.repo.commit('Sem-Ver: feature')
+        snapshot = git.get_history_snapshot(self.git_dir)
+        self.assertEqual(
+            set(['feature']), snapshot.get_semver_symbols('1.2.3.rc2')
+        )
+        self.assertEqual(
+            set(['feature', 'api-break']), snapshot.get_semver_symbols()
+        )
+        self.assertIsNone(snapshot.get_semver_symbols('badver'))
+
+    def test_co_authors_from_trailers(self):
+        self.repo.commit(
+            'Add a feature\n\n'
+            'Not a trailer, Co-authored-by: Foo Foo <foo@foo.com>\n\n'
+            'Co-authored-by: Bar Bar <bar@bar.com>\n'
+            'Co-Authored-By: Baz Baz <baz@baz.com>\n'
+        )
+        snapshot = git.get_history_snapshot(self.git_dir)
+        self.assertEqual(
+            set([u'Bar Bar <bar@bar.com>']), snapshot.get_co_authors()
+        )
+
+    def test_co_authors_without_trailer_support(self):
+        # Older git prints placeholders it does not understand as is.
         self.useFixture(
             fixtures.MonkeyPatch(
-                "os.path.exists",
-                lambda path: os.path.abspath(path) in exist_files,
+                'pbr.git._LOG_FORMAT',
+                git._LOG_FORMAT.replace('key=', 'nosuch='),
             )
         )
+        self.repo.commit('Add a feature\n\nCo-authored-by: Bar <bar@bar.com>')
+        log_count = self._count_log_commands()
+        snapshot = git.get_history_snapshot(self.git_dir)
+        self.assertEqual(
+            set([u'Bar <bar@bar.com>']), snapshot.get_co_authors()
+        )
+        self.assertEqual(2, log_count())
 
-        def _fake_run_shell_command(cmd, **kwargs):
-            return cmd_map[" ".join(cmd)]
+
+class TagIndexTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(TagIndexTest, self).setUp()
+        self.repo = self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.useFixture(pbr_fixtures.GPGKey())
+        self.git_dir = os.path.join(self.package_dir, '.git')
+        self.repo.commit()
+        self.repo.tag('1.2.3')
+        self.repo.tag('1.2.4-rc1')
+        self.repo.commit()
+        self.repo.tag('very-bad')
+
+    def test_index(self):
+        tag_index = git.get_tag_index(self.git_dir)
+        self.assertEqual(
+            version.SemanticVersion(1, 2, 4, 'rc', 1),
+            tag_index.get_semantic_version('1.2.4.rc1'),
+        )
+        self.assertIsNone(tag_index.get_semantic_version('very.bad'))
+        self.assertEqual(
+            '1.2.4.rc1', tag_index.get_version_tag(['1.2.3', '1.2.4.rc1'])
+        )
+        self.assertEqual(
+            '1.10.0', tag_index.get_highest_tag(['1.2.3', '1.10.0'])
+        )
+        self.assertIs(tag_index, git.get_tag_index(self.git_dir))
+        self.repo.tag('1.2.5')
+        self.assertIsNot(tag_index, git.get_tag_index(self.git_dir))
+
+    def test_index_with_native_git(self):
+        self.useFixture(fixtures.EnvironmentVariable('PBR_NATIVE_GIT', '1'))
+        self.assertEqual(
+            sorted(['1.2.3', '1.2.4-rc1', 'very-bad']),
+            sorted(git._read_tag_names(self.git_dir)),
+        )
+
+    def test_tags_parsed_once(self):
+        dest_dir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(
+            fixtures.EnvironmentVariable('SKIP_WRITE_GIT_CHANGELOG')
+        )
+        with mock.patch.object(
+            version.SemanticVersion,
+            'from_pip_string',
+            side_effect=version.SemanticVersion.from_pip_string,
+        ) as _from_pip_string:
+            git.write_git_changelog(git_dir=self.git_dir, dest_dir=dest_dir)
+            packaging._get_version_from_git_target(self.git_dir, None)
+        parsed = [args[0] for args, _ in _from_pip_string.call_args_list]
+        self.assertEqual(
+            sorted(['1.2.3', '1.2.4.rc1', 'very.bad']),
+            sorted(tag for tag in parsed if tag != '0'),
+        )
+
+
+class GitRecentHistoryTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(GitRecentHistoryTest, self).setUp()
+        self.repo = self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.useFixture(pbr_fixtures.GPGKey())
+        self.git_dir = os.path.join(self.package_dir, '.git')
+
+    def _git(self, *args):
+        util.run_cmd(('git',) + args, self.package_dir)
+
+    def _assertWalkMatches(self):
+        snapshot = git.get_history_snapshot(self.git_dir)
+        self.assertEqual(
+            snapshot.get_revno_and_last_tag(),
+            packaging._get_revno_and_last_tag(self.git_dir),
+        )
+
+    def _count_full_log_commands(self):
+        commands = self.useFixture(_RecordedGitCommands()).commands
+        return lambda: commands.count(git._log_command([]))
+
+    def test_tagged(self):
+        self.repo.commit()
+        self.repo.tag('1.2.3')
+        self.repo.commit('Sem-Ver: feature')
+        self.repo.commit()
+        full_log_count = self._count_full_log_commands()
+        self.assertEqual(
+            ('1.2.3', 2), packaging._get_revno_and_last_tag(self.git_dir)
+        )
+        self.assertEqual(
+            {'minor': True},
+            packaging._get_increment_kwargs(self.git_dir, '1.2.3'),
+        )
+        self.assertEqual(0, full_log_count())
+        self._assertWalkMatches()
+
+    def test_messages_filtered_by_git(self):
+        self.repo.commit()
+        self.repo.tag('1.2.3')
+        self.repo.commit('Sem-Ver: feature')
+        self.repo.commit('Fix it\n\n  sem-ver: api-break, bugfix\n')
+        self.repo.commit('Mention sem-ver: in passing')
+        commands = self.useFixture(_RecordedGitCommands()).commands
+        self.assertEqual(
+            {'major': True, 'minor': True},
+            packaging._get_increment_kwargs(self.git_dir, '1.2.3'),
+        )
+        for cmd in commands:
+            if '--format=%B' in cmd:
+                self.assertIn('--grep=sem-ver:', cmd)
+
+    def test_untagged(self):
+        for _ in range(3):
+            self.repo.commit()
+        full_log_count = self._count_full_log_commands()
+        self.assertEqual(
+            ('', 2), packaging._get_revno_and_last_tag(self.git_dir)
+        )
+        self.assertEqual(0, full_log_count())
+        self._assertWalkMatches()
+
+    def test_highest_tag_on_commit(self):
+        self.repo.commit()
+        self.repo.tag('1.2.3')
+        self.repo.tag('1.10.0')
+        self.repo.commit()
+        self.assertEqual(
+            ('1.10.0', 1), packaging._get_revno_and_last_tag(self.git_dir)
+        )
+        self._assertWalkMatches()
+
+    def test_non_version_tag(self):
+        self.repo.commit()
+        self.repo.tag('1.2.3')
+        self.repo.commit()
+        self.repo.tag('very-bad')
+        self.repo.commit()
+        self.assertIsNone(git.get_recent_history(self.git_dir))
+        self.assertEqual(
+            ('1.2.3', 2), packaging._get_revno_and_last_tag(self.git_dir)
+        )
+
+    def test_describe_ignores_match(self):
+        # git before 2.13 only honours the last --match, so it describes
+        # HEAD as a bare sha despite the version tags.
+        self.repo.commit()
+        self.repo.tag('1.2.3')
+        self.repo.commit()
+        run_git_command = git._run_git_command
+
+        def _run_git_command(cmd, git_dir, **kwargs):
+            if cmd[0] == 'describe':
+                return 'abcdef0'
+            return run_git_command(cmd, git_dir, **kwargs)
+
+        self.useFixture(
+            fixtures.MonkeyPatch('pbr.git._run_git_command', _run_git_command)
+        )
+        self.assertIsNone(git.get_recent_history(self.git_dir))
+        self.assertEqual(
+            ('1.2.3', 1), packaging._get_revno_and_last_tag(self.git_dir)
+        )
+
+    def test_merge(self):
+        self.repo.commit()
+        self.repo.tag('1.2.3')
+        self.repo.commit()
+        self._git('checkout', '-b', 'side', 'HEAD~1')
+        self.repo.commit('side commit')
+        self._git('checkout', '-')
+        self._git('merge', '--no-edit', 'side')
+        self.assertIsNone(git.get_recent_history(self.git_dir))
+        self._assertWalkMatches()
+
+
+class GitHistoryCacheTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(GitHistoryCacheTest, self).setUp()
+        self.repo = self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.useFixture(pbr_fixtures.GPGKey())
+        self.useFixture(fixtures.EnvironmentVariable('SKIP_GIT_HISTORY_CACHE'))
+        self.git_dir = os.path.join(self.package_dir, '.git')
+        self.repo.commit()
+        self.repo.tag('1.2.3')
+        self.repo.commit()
+
+    def _get_snapshot(self):
+        # Simulate a new process by dropping the in-process snapshots.
+        self.useFixture(fixtures.MonkeyPatch('pbr.git._history_snapshots', {}))
+        with _RecordedGitCommands() as recorded:
+            snapshot = git.get_history_snapshot(self.git_dir)
+        return snapshot, [cmd for cmd in recorded.commands if cmd[0] == 'log']
+
+    def test_cache_reused(self):
+        snapshot, log_commands = self._get_snapshot()
+        self.assertEqual(1, len(log_commands))
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(self.git_dir, 'pbr-cache', 'history.json')
+            )
+        )
+        cached, log_commands = self._get_snapshot()
+        self.assertEqual([], log_commands)
+        self.assertEqual(snapshot.commits, cached.commits)
+        self.assertEqual(('1.2.3', 1), cached.get_revno_and_last_tag())
+
+    def test_cache_extended(self):
+        snapshot, _ = self._get_snapshot()
+        self.repo.commit('Sem-Ver: feature')
+        updated, log_commands = self._get_snapshot()
+        self.assertEqual(1, len(log_commands))
+        self.assertEqual(
+            '%s..' % snapshot.state.head, log_commands[0][-1][:42]
+        )
+        self.assertEqual(snapshot.commits, updated.commits[1:])
+        self.assertEqual(('1.2.3', 2), updated.get_revno_and_last_tag())
+        self.assertEqual(set(['feature']), updated.get_semver_symbols('1.2.3'))
+
+    def test_cache_discarded_when_tags_change(self):
+        self._get_snapshot()
+        self.repo.tag('1.2.4')
+        snapshot, log_commands = self._get_snapshot()
+        self.assertEqual([git._log_command([])], log_commands)
+        self.assertEqual(('1.2.4', 0), snapshot.get_revno_and_last_tag())
+
+    def test_cache_discarded_when_history_rewritten(self):
+        self.repo.commit()
+        self._get_snapshot()
+        self.repo.uncommit()
+        self.repo.uncommit()
+        self.repo.commit('Sem-Ver: api-break')
+        snapshot, log_commands = self._get_snapshot()
+        self.assertEqual(git._log_command([]), log_commands[-1])
+        self.assertEqual(('1.2.3', 1), snapshot.get_revno_and_last_tag())
+        self.assertEqual(
+            set(['api-break']), snapshot.get_semver_symbols('1.2.3')
+        )
+
+    def test_cache_discarded_when_mailmap_changes(self):
+        self.repo.commit(author='A Dev <a@example.com>')
+        snapshot, _ = self._get_snapshot()
+        self.assertIn('A Dev <a@example.com>', snapshot.get_authors())
+        with open('.mailmap', 'w') as mailmap:
+            mailmap.write('Real Name <a@example.com>\n')
+        util.run_cmd(['git', 'add', '.mailmap'], self.package_dir)
+        self.repo.commit()
+        snapshot, log_commands = self._get_snapshot()
+        self.assertEqual([git._log_command([])], log_commands)
+        self.assertIn('Real Name <a@example.com>', snapshot.get_authors())
+        self.assertNotIn('A Dev <a@example.com>', snapshot.get_authors())
+
+    def test_cache_discarded_when_mailmap_file_changes(self):
+        self.repo.commit(author='A Dev <a@example.com>')
+        mailmap_path = os.path.join(self.temp_dir, 'mailmap')
+        with open(mailmap_path, 'w') as mailmap:
+            mailmap.write('Real Name <a@example.com>\n')
+        self._get_snapshot()
+        util.run_cmd(
+            ['git', 'config', 'mailmap.file', mailmap_path], self.package_dir
+        )
+        snapshot, log_commands = self._get_snapshot()
+        self.assertEqual([git._log_command([])], log_commands)
+        self.assertIn('Real Name <a@example.com>', snapshot.get_authors())
+        with open(mailmap_path, 'w') as mailmap:
+            mailmap.write('Other Name <a@example.com>\n')
+        snapshot, _ = self._get_snapshot()
+        self.assertIn('Other Name <a@example.com>', snapshot.get_authors())
+
+    def test_cache_skipped(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('SKIP_GIT_HISTORY_CACHE', '1')
+        )
+        self._get_snapshot()
+        _, log_commands = self._get_snapshot()
+        self.assertEqual(1, len(log_commands))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.git_dir, 'pbr-cache'))
+        )
+
+
+class GitChangeLogUpdateTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(GitChangeLogUpdateTest, self).setUp()
+        self.repo = self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.useFixture(pbr_fixtures.GPGKey())
+        self.useFixture(fixtures.EnvironmentVariable('SKIP_GIT_HISTORY_CACHE'))
+        self.useFixture(
+            fixtures.EnvironmentVariable('SKIP_WRITE_GIT_CHANGELOG')
+        )
+        self.git_dir = os.path.join(self.package_dir, '.git')
+        self.dest_dir = self.useFixture(fixtures.TempDir()).path
+        self.repo.commit('First')
+        self.repo.tag('1.2.3')
+        self.repo.commit('Second')
+        self.updates = []
+        update_changelog = git._update_changelog
+
+        def _update_changelog(*args):
+            self.updates.append(update_changelog(*args))
+            return self.updates[-1]
 
         self.useFixture(
             fixtures.MonkeyPatch(
-                "pbr.git._run_shell_command", _fake_run_shell_command
+                'pbr.git._update_changelog', _update_changelog
             )
         )
 
-        with open(os.path.join(self.temp_path, "AUTHORS.in"), "w") as auth_fh:
-            auth_fh.write("%s\n" % author_old)
+    def _git(self, *args):
+        util.run_cmd(('git',) + args, self.package_dir)
 
-        git.generate_authors(git_dir=self.git_dir, dest_dir=self.temp_path)
+    def _write_changelog(self):
+        git.write_git_changelog(git_dir=self.git_dir, dest_dir=self.dest_dir)
+        with open(os.path.join(self.dest_dir, 'ChangeLog'), 'r') as ch_fh:
+            changelog = ch_fh.read()
+        expected = git._iter_changelog(git._iter_log_oneline(self.git_dir))
+        self.assertEqual(
+            ''.join(content for _, content in expected), changelog
+        )
+        return changelog
 
-        with open(os.path.join(self.temp_path, "AUTHORS"), "r") as auth_fh:
-            authors = auth_fh.read()
-            self.assertIn(author_old, authors)
-            self.assertIn(author_new, authors)
-            self.assertIn(co_author, authors)
+    def test_new_commits_spliced(self):
+        self._write_changelog()
+        self.repo.commit('Third')
+        self.repo.commit('Fourth')
+        changelog = self._write_changelog()
+        self.assertIsNotNone(self.updates[-1])
+        self.assertIn('* Fourth\n* Third\n* Second\n\n1.2.3\n', changelog)
+
+    def test_new_commits_before_release(self):
+        self.repo.tag('1.2.4')
+        self._write_changelog()
+        self.repo.commit('Third')
+        changelog = self._write_changelog()
+        self.assertIsNotNone(self.updates[-1])
+        self.assertIn('* Third\n\n1.2.4\n-----\n\n* Second\n', changelog)
+
+    def test_new_merge_spliced(self):
+        self._write_changelog()
+        # Make sure the merged commit is listed before the old HEAD.
+        self.useFixture(
+            fixtures.EnvironmentVariable('GIT_COMMITTER_DATE', '2100-01-01')
+        )
+        self._git('checkout', '-b', 'side')
+        self.repo.commit('Side')
+        self._git('checkout', '-')
+        self._git('merge', '--no-ff', '--no-edit', 'side')
+        self._write_changelog()
+        self.assertIsNotNone(self.updates[-1])
+
+    def test_rewritten_when_tags_change(self):
+        self._write_changelog()
+        self.repo.commit('Third')
+        self.repo.tag('1.2.4')
+        self._write_changelog()
+        self.assertIsNone(self.updates[-1])
+
+    def test_rewritten_when_history_rewritten(self):
+        self._write_changelog()
+        self.repo.uncommit()
+        self.repo.commit('Other second')
+        self._write_changelog()
+        self.assertIsNone(self.updates[-1])
+
+    def test_rewritten_when_older_commits_merged(self):
+        self._git('checkout', '-b', 'side', 'HEAD~1')
+        self.repo.commit('Side')
+        self._git('checkout', '-')
+        self._write_changelog()
+        self._git('merge', '--no-edit', 'side')
+        self._write_changelog()
+        self.assertIsNone(self.updates[-1])
+
+    def test_rewritten_when_modified(self):
+        self._write_changelog()
+        with open(os.path.join(self.dest_dir, 'ChangeLog'), 'a') as ch_fh:
+            ch_fh.write('* Edited\n')
+        self.repo.commit('Third')
+        self._write_changelog()
+        self.assertIsNone(self.updates[-1])
+
+    def test_cache_skipped(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('SKIP_GIT_HISTORY_CACHE', '1')
+        )
+        self._write_changelog()
+        self.repo.commit('Third')
+        self._write_changelog()
+        self.assertEqual([], self.updates)
+
+
+class GitChangeLogLimitsTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(GitChangeLogLimitsTest, self).setUp()
+        self.repo = self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.useFixture(pbr_fixtures.GPGKey())
+        self.useFixture(
+            fixtures.EnvironmentVariable('SKIP_WRITE_GIT_CHANGELOG')
+        )
+        self.git_dir = os.path.join(self.package_dir, '.git')
+        self.dest_dir = self.useFixture(fixtures.TempDir()).path
+        for tag in ('1.0.0', '1.1.0', '2.0.0-rc1', '2.0.0'):
+            self.repo.commit('Before %s' % tag)
+            self.repo.tag(tag)
+        self.repo.commit('Unreleased')
+        self.walked = []
+        iter_log_oneline = git._iter_log_oneline
+
+        def _iter_log_oneline(git_dir=None):
+            for entry in iter_log_oneline(git_dir):
+                self.walked.append(entry)
+                yield entry
+
+        self.useFixture(
+            fixtures.MonkeyPatch(
+                'pbr.git._iter_log_oneline', _iter_log_oneline
+            )
+        )
+
+    def _write_changelog(self, **options):
+        option_dict = dict(
+            (name, ('setup.cfg', value)) for name, value in options.items()
+        )
+        git.write_git_changelog(
+            git_dir=self.git_dir,
+            dest_dir=self.dest_dir,
+            option_dict=option_dict,
+        )
+        with open(os.path.join(self.dest_dir, 'ChangeLog'), 'r') as ch_fh:
+            return ch_fh.read()
+
+    def test_max_releases(self):
+        changelog = self._write_changelog(changelog_max_releases='2')
+        self.assertEqual(
+            'CHANGES\n=======\n\n'
+            '* Unreleased\n\n'
+            '2.0.0\n-----\n\n'
+            '* Before 2.0.0\n\n'
+            '2.0.0.rc1\n---------\n\n'
+            '* Before 2.0.0-rc1\n\n' + git._CHANGELOG_TRUNCATED,
+            changelog,
+        )
+        # The history is not walked past the first excluded release.
+        self.assertEqual(4, len(self.walked))
+
+    def test_no_releases(self):
+        changelog = self._write_changelog(changelog_max_releases='0')
+        self.assertEqual(
+            'CHANGES\n=======\n\n* Unreleased\n\n' + git._CHANGELOG_TRUNCATED,
+            changelog,
+        )
+
+    def test_since(self):
+        changelog = self._write_changelog(changelog_since='2.0.0-rc1')
+        self.assertIn('2.0.0\n', changelog)
+        self.assertNotIn('2.0.0.rc1', changelog)
+        self.assertTrue(changelog.endswith(git._CHANGELOG_TRUNCATED))
+        self.assertEqual(3, len(self.walked))
+
+    def test_limits_not_reached(self):
+        changelog = self._write_changelog(
+            changelog_max_releases='10', changelog_since='0.1'
+        )
+        self.assertIn('1.0.0\n', changelog)
+        self.assertNotIn(git._CHANGELOG_TRUNCATED, changelog)
+
+    def test_invalid_max_releases(self):
+        self.assertRaises(
+            distutils.errors.DistutilsOptionError,
+            self._write_changelog,
+            changelog_max_releases='many',
+        )
+
+    def test_invalid_since(self):
+        self.assertRaises(
+            distutils.errors.DistutilsOptionError,
+            self._write_changelog,
+            changelog_since='foo',
+        )
+
+
+class _SubjectsRenderer(git.ChangeLogRenderer):
+
+    filename = 'SUBJECTS'
+
+    def change(self, release, sha, msg):
+        return msg + '\n'
+
+
+class GitChangeLogFormatsTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(GitChangeLogFormatsTest, self).setUp()
+        self.repo = self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.useFixture(pbr_fixtures.GPGKey())
+        self.useFixture(
+            fixtures.EnvironmentVariable('SKIP_WRITE_GIT_CHANGELOG')
+        )
+        self.git_dir = os.path.join(self.package_dir, '.git')
+        self.dest_dir = self.useFixture(fixtures.TempDir()).path
+        self.repo.commit('Add the_thing [1]')
+        self.repo.tag('1.0.0')
+        self.repo.commit('Fix *it*.')
+
+    def _write_changelog(self, formats):
+        option_dict = {'changelog_formats': ('setup.cfg', formats)}
+        git.write_git_changelog(
+            git_dir=self.git_dir,
+            dest_dir=self.dest_dir,
+            option_dict=option_dict,
+        )
+
+    def _read(self, filename):
+        with io.open(os.path.join(self.dest_dir, filename), 'r') as ch_fh:
+            return ch_fh.read()
+
+    def test_all_formats(self):
+        with _RecordedGitCommands() as recorded:
+            self._write_changelog('rst, markdown jsonl')
+        self.assertEqual(
+            [], [cmd for cmd in recorded.commands if cmd[0] == 'log'][1:]
+        )
+        self.assertEqual(
+            'CHANGES\n=======\n\n'
+            '* Fix \\*it\\*\n\n'
+            '1.0.0\n-----\n\n'
+            '* Add the\\_thing [1]\n',
+            self._read('ChangeLog'),
+        )
+        self.assertEqual(
+            '# CHANGES\n\n'
+            '* Fix \\*it\\*\n\n'
+            '## 1.0.0\n\n'
+            '* Add the\\_thing \\[1\\]\n',
+            self._read('ChangeLog.md'),
+        )
+        entries = [
+            json.loads(line)
+            for line in self._read('ChangeLog.jsonl').splitlines()
+        ]
+        self.assertEqual(
+            [(None, 'Fix *it*.'), ('1.0.0', 'Add the_thing [1]')],
+            [(entry['release'], entry['subject']) for entry in entries],
+        )
+
+    def test_custom_format(self):
+        self._write_changelog('pbr.tests.test_git._SubjectsRenderer')
+        self.assertEqual(
+            'Fix *it*.\nAdd the_thing [1]\n', self._read('SUBJECTS')
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dest_dir, 'ChangeLog'))
+        )
+
+    def test_unknown_format(self):
+        self.assertRaises(
+            distutils.errors.DistutilsOptionError,
+            self._write_changelog,
+            'rst, nosuch',
+        )
+
+
+class GitVersionModuleTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(GitVersionModuleTest, self).setUp()
+        self.repo = self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.useFixture(pbr_fixtures.GPGKey())
+        self.git_dir = os.path.join(self.package_dir, '.git')
+        self.dest_dir = self.useFixture(fixtures.TempDir()).path
+        os.mkdir(os.path.join(self.dest_dir, 'pkg'))
+        self.path = os.path.join(self.dest_dir, 'pkg', '_version.py')
+        self.repo.commit()
+
+    def _write_version_module(self, path='pkg/_version.py', git_dir=None):
+        option_dict = {'version_module': ('setup.cfg', path)}
+        git.write_version_module(
+            'pkg',
+            '1.2.3',
+            git_dir=git_dir or self.git_dir,
+            dest_dir=self.dest_dir,
+            option_dict=option_dict,
+        )
+
+    def _read_version_module(self):
+        values = {}
+        with open(self.path, 'r') as f:
+            exec(f.read(), values)
+        return values
+
+    def test_write(self):
+        self._write_version_module()
+        values = self._read_version_module()
+        with open(self.path, 'r') as f:
+            self.assertEqual(
+                version._VERSION_MODULE_HEADER + '\n', f.readline()
+            )
+        self.assertEqual('pkg', values['package'])
+        self.assertEqual('1.2.3', values['version'])
+        self.assertEqual(
+            git.get_git_short_sha(self.git_dir), values['git_sha']
+        )
+        self.assertFalse(values['is_release'])
+
+    def test_write_release(self):
+        self.repo.tag('1.2.3')
+        self._write_version_module()
+        self.assertTrue(self._read_version_module()['is_release'])
+
+    def test_unchanged(self):
+        self._write_version_module()
+        os.utime(self.path, (0, 0))
+        self._write_version_module()
+        self.assertEqual(0, os.stat(self.path).st_mtime)
+
+    def test_not_set(self):
+        git.write_version_module(
+            'pkg', '1.2.3', git_dir=self.git_dir, dest_dir=self.dest_dir
+        )
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_no_git(self):
+        with mock.patch.object(git, '_run_git_functions', return_value=None):
+            git.write_version_module(
+                'pkg',
+                '1.2.3',
+                dest_dir=self.dest_dir,
+                option_dict={
+                    'version_module': ('setup.cfg', 'pkg/_version.py')
+                },
+            )
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_invalid_path(self):
+        for path in ('_version.py', '/pkg/_version.py', 'pkg/../_version.py'):
+            self.assertRaises(
+                distutils.errors.DistutilsOptionError,
+                self._write_version_module,
+                path,
+            )
@@ -0,0 +1,259 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+
+import fixtures
+
+from pbr import git
+from pbr import git_native
+from pbr.tests import base
+from pbr.tests import fixtures as pbr_fixtures
+from pbr.tests import util
+
+if sys.version_info >= (3, 3):
+    from unittest import mock
+else:
+    import mock  # noqa
+
+
+class TestFindGitDir(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestFindGitDir, self).setUp()
+        self.useFixture(fixtures.EnvironmentVariable('PBR_NATIVE_GIT', '1'))
+        self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+
+    def test_top_level(self):
+        self.assertEqual('.git', git_native.find_git_dir())
+
+    def test_subdirectory(self):
+        os.chdir(os.path.join(self.package_dir, 'pbr_testpackage'))
+        self.assertEqual(
+            os.path.join(self.package_dir, '.git'), git_native.find_git_dir()
+        )
+
+    def test_not_a_repository(self):
+        tempdir = self.useFixture(fixtures.TempDir()).path
+        self.assertIsNone(git_native.find_git_dir(tempdir))
+
+    def test_git_dir_environment(self):
+        self.useFixture(fixtures.EnvironmentVariable('GIT_DIR', '.git'))
+        self.assertRaises(
+            git_native.UnsupportedRepository, git_native.find_git_dir
+        )
+
+
+class TestRepository(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRepository, self).setUp()
+        self.useFixture(fixtures.EnvironmentVariable('PBR_NATIVE_GIT', '1'))
+        self.repo = self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.git_dir = os.path.join(self.package_dir, '.git')
+
+    def _git(self, *args):
+        stdout, _, returncode = util.run_cmd(('git',) + args, self.package_dir)
+        self.assertEqual(0, returncode)
+        return stdout
+
+    def _tag(self, name, rev='HEAD'):
+        self._git('tag', '-a', '-m', 'test tag', name, rev)
+
+    def assertMatchesGit(self):
+        repository = git_native.Repository(self.git_dir)
+        head = repository.read_head()
+        self.assertEqual(self._git('rev-parse', 'HEAD'), head)
+        self.assertEqual(
+            self._git('log', '-n1', '--pretty=format:%h'),
+            repository.abbreviate(head),
+        )
+        self.assertEqual(
+            self._git('describe', '--always'), repository.describe()
+        )
+
+    def test_untagged(self):
+        self.repo.commit()
+        self.assertMatchesGit()
+
+    def test_exact_tag(self):
+        self.repo.commit()
+        self._tag('1.0.0')
+        self.assertMatchesGit()
+
+    def test_tag_distance(self):
+        self.repo.commit()
+        self._tag('1.0.0')
+        self.repo.commit()
+        self._git('tag', 'lightweight')
+        self.repo.commit()
+        self.assertMatchesGit()
+
+    def test_merged_tags(self):
+        self.repo.commit()
+        self._tag('1.0.0')
+        self.repo.commit()
+        self._git('checkout', '-b', 'side', 'HEAD~1')
+        self.repo.commit('side commit')
+        self._tag('2.0.0.0rc1')
+        self._git('checkout', '-')
+        self._git('merge', '--no-edit', 'side')
+        self.assertMatchesGit()
+
+    def test_misnamed_tag(self):
+        self.repo.commit()
+        self._tag('1.0.0')
+        os.rename(
+            os.path.join(self.git_dir, 'refs', 'tags', '1.0.0'),
+            os.path.join(self.git_dir, 'refs', 'tags', '2.0.0'),
+        )
+        self.assertMatchesGit()
+
+    def test_packed(self):
+        for version in ('1.0.0', '1.1.0', '1.2.0'):
+            self.repo.commit()
+            self._tag(version)
+        self.repo.commit()
+        self._git('gc', '--aggressive')
+        self.assertMatchesGit()
+        self.repo.commit()
+        self.assertMatchesGit()
+
+    def test_peeled_tags(self):
+        self.repo.commit()
+        self._tag('1.0.0')
+        self._git('tag', 'lightweight')
+        self._git('pack-refs', '--all')
+        self.repo.commit()
+        self._tag('1.1.0')
+        expected = self._git('show-ref', '--tags', '-d').split('\n')
+        tags = []
+        repository = git_native.Repository(self.git_dir)
+        for name, sha, peeled in repository.read_peeled_tags():
+            tags.append('%s refs/tags/%s' % (sha, name))
+            if peeled != sha:
+                tags.append('%s refs/tags/%s^{}' % (peeled, name))
+        self.assertEqual(expected, tags)
+
+    def test_shallow_unsupported(self):
+        self.repo.commit()
+        open(os.path.join(self.git_dir, 'shallow'), 'w').close()
+        self.assertRaises(
+            git_native.UnsupportedRepository,
+            git_native.Repository,
+            self.git_dir,
+        )
+
+    def test_abbrev_config_unsupported(self):
+        self.repo.commit()
+        self._git('config', 'core.abbrev', '12')
+        self.assertRaises(
+            git_native.UnsupportedRepository,
+            git_native.Repository,
+            self.git_dir,
+        )
+
+    def test_index_versions(self):
+        os.makedirs(os.path.join(self.package_dir, 'a', 'b'))
+        for path in (['a', 'b', 'c'], ['a', 'd'], [u'\xe9t\xe9']):
+            open(os.path.join(self.package_dir, *path), 'w').close()
+        self._git('add', '.')
+        self.repo.commit()
+        open(os.path.join(self.package_dir, 'new'), 'w').close()
+        # intent to add entries use the extended flags of version 3
+        self._git('add', '--intent-to-add', 'new')
+        for version in ('2', '3', '4'):
+            self._git('update-index', '--index-version', version)
+            repository = git_native.Repository(self.git_dir)
+            ls_files = self._git('ls-files', '-z').encode('latin1')
+            self.assertEqual(
+                ls_files.decode('utf-8').rstrip('\x00').split('\x00'),
+                list(repository.read_index_paths()),
+            )
+
+    def test_split_index_unsupported(self):
+        self.repo.commit()
+        self._git('update-index', '--split-index')
+        repository = git_native.Repository(self.git_dir)
+        self.assertRaises(
+            git_native.UnsupportedRepository, repository.read_index_paths
+        )
+        self.assertIn('setup.py', git._find_git_files(git_dir=self.git_dir))
+
+    def test_unreadable_index_falls_back(self):
+        self.repo.commit()
+        with mock.patch.object(
+            git_native,
+            '_read_index_paths',
+            side_effect=git_native.UnsupportedRepository('oops'),
+        ):
+            files = git._find_git_files(git_dir=self.git_dir)
+        self.assertEqual(
+            self._git('ls-files', '-z').rstrip('\x00').split('\x00'), files
+        )
+
+    def test_packs_shared(self):
+        self.useFixture(fixtures.MockPatchObject(git_native, '_packs', {}))
+        self.repo.commit()
+        self._git('gc')
+        head = self._git('rev-parse', 'HEAD')
+        first = git_native.Repository(self.git_dir)
+        second = git_native.Repository(self.git_dir)
+        self.assertEqual('commit', first.read_object(head)[0])
+        self.assertEqual('commit', second.read_object(head)[0])
+        self.assertEqual(1, len(git_native._packs))
+        (pack,) = first._get_packs()
+        self.assertIs(pack, second._get_packs()[0])
+
+        # Packs replaced by a repack are unmapped.
+        self.repo.commit()
+        self._git('repack', '-a', '-d')
+        head = self._git('rev-parse', 'HEAD')
+        third = git_native.Repository(self.git_dir)
+        self.assertEqual('commit', third.read_object(head)[0])
+        self.assertEqual(1, len(git_native._packs))
+        self.assertIsNot(pack, third._get_packs()[0])
+        self.assertTrue(pack._index.closed)
+        self.assertTrue(pack._pack.closed)
+
+    def test_git_not_run(self):
+        self.repo.commit()
+        self._tag('1.0.0')
+        expected = self._git('log', '-n1', '--pretty=format:%h')
+        with mock.patch.object(git, '_run_shell_command') as _command:
+            self.assertEqual(expected, git.get_git_short_sha(self.git_dir))
+            self.assertTrue(git.get_is_release(self.git_dir))
+            self.assertIn(
+                'setup.py', git._find_git_files(git_dir=self.git_dir)
+            )
+            self.assertFalse(_command.called)
+
+    def test_fallback(self):
+        self.repo.commit()
+        self._tag('1.0.0')
+        self._git('config', 'core.abbrev', '12')
+        self.assertEqual(
+            self._git('rev-parse', 'HEAD')[:12],
+            git.get_git_short_sha(self.git_dir),
+        )
+        self.assertTrue(git.get_is_release(self.git_dir))
+
+    def test_native_git_not_enabled(self):
+        self.repo.commit()
+        self.useFixture(fixtures.EnvironmentVariable('PBR_NATIVE_GIT'))
+        with mock.patch.object(git_native, 'Repository') as _repository:
+            git.get_git_short_sha(self.git_dir)
+            self.assertFalse(_repository.called)
@@ -0,0 +1,94 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import sys
+
+from pbr import hooks
+from pbr import packaging
+from pbr.tests import base
+
+if sys.version_info >= (3, 3):
+    from unittest import mock
+else:
+    import mock  # noqa
+
+
+class TestNeededMetadata(base.BaseTestCase):
+
+    scenarios = [
+        ('none', {'script_args': None, 'needed': hooks.ALL_METADATA}),
+        ('empty', {'script_args': [], 'needed': hooks.ALL_METADATA}),
+        ('name', {'script_args': ['--name'], 'needed': set()}),
+        (
+            'display',
+            {'script_args': ['-q', '--name', '--url'], 'needed': set()},
+        ),
+        (
+            'fullname',
+            {'script_args': ['--name', '--fullname'], 'needed': {'version'}},
+        ),
+        ('clean', {'script_args': ['clean', '--all'], 'needed': {'files'}}),
+        (
+            'version-commands',
+            {
+                'script_args': ['rpm_version', 'deb_version'],
+                'needed': {'files'},
+            },
+        ),
+        ('build', {'script_args': ['build'], 'needed': hooks.ALL_METADATA}),
+        (
+            'clean-and-build',
+            {'script_args': ['clean', 'build'], 'needed': hooks.ALL_METADATA},
+        ),
+        (
+            'command-option',
+            {
+                'script_args': ['clean', '--build-base', 'b'],
+                'needed': hooks.ALL_METADATA,
+            },
+        ),
+        (
+            'display-after-command',
+            {'script_args': ['clean', '--name'], 'needed': hooks.ALL_METADATA},
+        ),
+    ]
+
+    def test_get_needed_metadata(self):
+        self.assertEqual(
+            self.needed, hooks.get_needed_metadata(self.script_args)
+        )
+
+
+class TestSetupHook(base.BaseTestCase):
+
+    def _setup_hook(self, script_args):
+        config = {'metadata': {'name': 'pbr_testpackage'}, 'files': {}}
+        hooks.setup_hook(config, script_args)
+        return config
+
+    def test_name(self):
+        with mock.patch.object(packaging, 'get_version') as _get_version:
+            config = self._setup_hook(['--name'])
+        self.assertFalse(_get_version.called)
+        self.assertNotIn('version', config['metadata'])
+        self.assertNotIn('requires_dist', config['metadata'])
+        self.assertNotIn('packages', config['files'])
+        self.assertIn('commands', config['global'])
+
+    def test_build(self):
+        config = self._setup_hook(['build'])
+        self.assertEqual('0.0', config['metadata']['version'])
+        self.assertIn('requires_dist', config['metadata'])
+        self.assertEqual('pbr_testpackage', config['files']['packages'])
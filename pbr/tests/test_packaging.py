@@ -41,6 +41,7 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
+import distutils.errors
 import email.errors
 import os
 import re
@@ -126,6 +127,16 @@ class ParseRequirementsTest(base.BaseTestCase):
         result = packaging.parse_requirements([requirements])
         self.assertEqual(['pbr'], result)
 
+    def test_comments(self):
+        tempdir = tempfile.mkdtemp()
+        requirements = os.path.join(tempdir, 'requirements.txt')
+        with open(requirements, 'w') as f:
+            f.write('# comment\n')
+            f.write('  # indented comment\n')
+            f.write('pbr>=1.0  # trailing comment\n')
+        result = packaging.parse_requirements([requirements])
+        self.assertEqual(['pbr>=1.0  '], result)
+
 
 class ParseRequirementsTestScenarios(base.BaseTestCase):
 
@@ -220,6 +231,100 @@ class ParseDependencyLinksTest(base.BaseTestCase):
         )
 
 
+class ParsedRequirementsTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(ParsedRequirementsTest, self).setUp()
+        self.useFixture(
+            fixtures.MockPatchObject(packaging, '_parsed_requirements', {})
+        )
+        self.parse_line = self.useFixture(
+            fixtures.MockPatchObject(
+                packaging,
+                '_parse_requirement_line',
+                side_effect=packaging._parse_requirement_line,
+            )
+        ).mock
+        with open('requirements.txt', 'w') as f:
+            f.write('-e git://foo.com/zipball#egg=bar\nfoo; os_name == "a"\n')
+
+    def test_parsed_once(self):
+        self.assertEqual(
+            ['bar', 'foo; os_name == "a"'],
+            packaging.parse_requirements(['requirements.txt']),
+        )
+        self.assertEqual(
+            ['bar', 'foo'],
+            packaging.parse_requirements(
+                ['requirements.txt'], strip_markers=True
+            ),
+        )
+        self.assertEqual(
+            ['git://foo.com/zipball#egg=bar'],
+            packaging.parse_dependency_links(['requirements.txt']),
+        )
+        self.assertEqual(3, self.parse_line.call_count)
+
+    def test_changed(self):
+        packaging.parse_requirements(['requirements.txt'])
+        with open('requirements.txt', 'a') as f:
+            f.write('baz\n')
+        self.assertEqual(
+            ['bar', 'foo; os_name == "a"', 'baz'],
+            packaging.parse_requirements(['requirements.txt']),
+        )
+        self.assertEqual(7, self.parse_line.call_count)
+
+
+class ResolveRequirementsTest(base.BaseTestCase):
+
+    def _write(self, filename, *lines):
+        with open(filename, 'w') as f:
+            f.write('\n'.join(lines))
+
+    def test_provenance(self):
+        self._write('requirements.txt', '# base', '-r base.txt', 'foo')
+        self._write('base.txt', 'bar', '', 'baz; os_name == "a"')
+        self.assertEqual(
+            [
+                packaging.ResolvedRequirement('bar', 'base.txt', 1),
+                packaging.ResolvedRequirement(
+                    'baz; os_name == "a"', 'base.txt', 3
+                ),
+                packaging.ResolvedRequirement('foo', 'requirements.txt', 3),
+            ],
+            packaging.resolve_requirements(['requirements.txt']),
+        )
+
+    def test_diamond(self):
+        self._write('requirements.txt', '-r left.txt', '-r right.txt')
+        self._write('left.txt', '-r base.txt', 'left')
+        self._write('right.txt', '-r base.txt', 'right')
+        self._write('base.txt', 'base')
+        with mock.patch.object(
+            packaging,
+            '_get_parsed_requirements',
+            side_effect=packaging._get_parsed_requirements,
+        ) as _parsed:
+            self.assertEqual(
+                ['base', 'left', 'base', 'right'],
+                packaging.parse_requirements(['requirements.txt']),
+            )
+        self.assertEqual(4, _parsed.call_count)
+
+    def test_cycle(self):
+        self._write('requirements.txt', 'foo', '-r other.txt')
+        self._write('other.txt', '-r requirements.txt')
+        e = self.assertRaises(
+            distutils.errors.DistutilsFileError,
+            packaging.parse_requirements,
+            ['requirements.txt'],
+        )
+        self.assertIn(
+            'requirements.txt -> other.txt -> requirements.txt', str(e)
+        )
+
+
 class TestVersions(base.BaseTestCase):
 
     scenarios = [
@@ -383,6 +488,14 @@ class TestVersions(base.BaseTestCase):
         version = packaging._get_version_from_git()
         self.assertEqual('1.2.3.0rc3.dev1', version)
 
+    def test_untagged_version_after_semver_compliant_prerelease_headers(self):
+        # The Sem-Ver headers since a tag with a - in its name are ignored.
+        self.repo.commit()
+        self.repo.tag('1.2.3-rc2')
+        self.repo.commit('sem-ver: api-break')
+        version = packaging._get_version_from_git()
+        self.assertEqual('1.2.3.0rc3.dev1', version)
+
     def test_preversion_too_low_simple(self):
         # That is, the target version is either already released or not high
         # enough for the semver requirements given api breaks etc.
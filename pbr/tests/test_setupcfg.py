@@ -22,9 +22,13 @@ import tempfile
 import textwrap
 import warnings
 
+import fixtures
+
 from pbr._compat.five import ConfigParser
+from pbr import hooks
 from pbr import setupcfg
 from pbr.tests import base
+from pbr.tests import fixtures as pbr_fixtures
 
 
 def config_from_ini(ini):
@@ -482,3 +486,101 @@ class TestUTF8DescriptionFile(base.BaseTestCase):
         config = config_from_ini(ini)
         kwargs = setupcfg.setup_cfg_to_setup_kwargs(config)
         self.assertEqual(unicode_description, kwargs['long_description'])
+
+
+def _unserialisable_hook(config):
+    config['global']['unserialisable'] = object()
+
+
+class TestSetupCache(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestSetupCache, self).setUp()
+        self.repo = self.useFixture(pbr_fixtures.GitRepo(self.package_dir))
+        self.useFixture(fixtures.EnvironmentVariable('SKIP_SETUP_CACHE'))
+        # the custom command is not importable from the test process
+        with open('setup.cfg') as setup_cfg:
+            lines = setup_cfg.readlines()
+        with open('setup.cfg', 'w') as setup_cfg:
+            setup_cfg.writelines(
+                line for line in lines if not line.startswith('commands =')
+            )
+        self.repo.commit()
+        self.setup_hook = self.useFixture(
+            fixtures.MockPatch(
+                'pbr.hooks.setup_hook', side_effect=hooks.setup_hook
+            )
+        ).mock
+
+    def _setup_cfg_to_args(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return setupcfg.setup_cfg_to_args('setup.cfg')
+
+    def test_reused(self):
+        kwargs = self._setup_cfg_to_args()
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(self.package_dir, 'build', 'pbr-cache')
+            )
+        )
+        cached = self._setup_cfg_to_args()
+        self.assertEqual(1, self.setup_hook.call_count)
+        for key in ('name', 'version', 'packages', 'data_files', 'cmdclass'):
+            self.assertEqual(kwargs[key], cached[key])
+
+    def test_requirements_changed(self):
+        self._setup_cfg_to_args()
+        with open('test-requirements.txt', 'a') as requirements:
+            requirements.write('fixtures\n')
+        self.assertIn('fixtures', self._setup_cfg_to_args()['tests_require'])
+        self.assertEqual(2, self.setup_hook.call_count)
+
+    def test_files_changed(self):
+        self._setup_cfg_to_args()
+        self._setup_cfg_to_args()
+        open(os.path.join('data_files', 'new'), 'w').close()
+        self._setup_cfg_to_args()
+        self.repo.commit()
+        self._setup_cfg_to_args()
+        self.assertEqual(3, self.setup_hook.call_count)
+
+    def test_ignored_data_files_changed(self):
+        with open('.gitignore', 'a') as gitignore:
+            gitignore.write('*.gen\n')
+        self.repo.commit()
+        self._setup_cfg_to_args()
+        open(os.path.join('data_files', 'b.gen'), 'w').close()
+        data_files = dict(self._setup_cfg_to_args()['data_files'])
+        self.assertIn(
+            os.path.join('data_files', 'b.gen'),
+            data_files['testpackage/data_files/'],
+        )
+        self.assertEqual(2, self.setup_hook.call_count)
+
+    def test_unserialisable_config(self):
+        with open('setup.cfg') as setup_cfg:
+            content = setup_cfg.read()
+        with open('setup.cfg', 'w') as setup_cfg:
+            setup_cfg.write(
+                content.replace(
+                    '#setup_hooks =',
+                    'setup_hooks = pbr.tests.test_setupcfg._unserialisable_hook',
+                )
+            )
+        self.assertIn('version', self._setup_cfg_to_args())
+        self.assertEqual(1, self.setup_hook.call_count)
+        self.assertFalse(os.path.exists('build'))
+
+    def test_environment_changed(self):
+        self._setup_cfg_to_args()
+        self.useFixture(fixtures.EnvironmentVariable('PBR_VERSION', '1.0'))
+        self.assertEqual('1.0', self._setup_cfg_to_args()['version'])
+        self.assertEqual(2, self.setup_hook.call_count)
+
+    def test_skipped(self):
+        self.useFixture(fixtures.EnvironmentVariable('SKIP_SETUP_CACHE', '1'))
+        self._setup_cfg_to_args()
+        self._setup_cfg_to_args()
+        self.assertEqual(2, self.setup_hook.call_count)
+        self.assertFalse(os.path.exists('build'))
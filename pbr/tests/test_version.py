@@ -16,13 +16,24 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
+import collections
 import itertools
+import os
+import sys
+import threading
+import time
 
+import fixtures
 from testtools import matchers
 
 from pbr.tests import base
 from pbr import version
 
+if sys.version_info >= (3, 3):
+    from unittest import mock
+else:
+    import mock  # noqa
+
 
 from_pip_string = version.SemanticVersion.from_pip_string
 
@@ -146,6 +157,123 @@ class TestSemanticVersion(base.BaseTestCase):
             ValueError, from_pip_string, 'non-release-tag/2014.12.16-1'
         )
 
+    def test_from_pip_string_interned(self):
+        semver = from_pip_string('1.2.0')
+        self.assertIs(semver, from_pip_string('1.2'))
+        self.assertIs(semver, from_pip_string('v1.2.0'))
+        self.assertIsNot(semver, from_pip_string('1.2.0.0rc1'))
+        self.assertFalse(hasattr(semver, '__dict__'))
+
+    def test_from_pip_string_canonical(self):
+        for version_string in (
+            '1',
+            'v1.2',
+            '1.2.3',
+            '1.2.3.0a1',
+            '1.2.3.b2',
+            '1.2.3.0rc3.dev4',
+            '1.2.3.dev4',
+            '1.2.3.dev0',
+            '1.2.3.post2',
+            '1.2.3.0rc1.post2',
+            '1.2.3.dev4.post2',
+            '1.2.3.post0',
+            '0.10.1.3.g83bef74',
+            '0.10.1.03',
+        ):
+            semver = version.SemanticVersion._from_pip_string_canonical(
+                version_string
+            )
+            self.assertIsNotNone(semver, version_string)
+            self.assertEqual(
+                version.SemanticVersion._from_pip_string_unsafe(
+                    version_string
+                ),
+                semver,
+                version_string,
+            )
+        for version_string in (
+            '1.2.0a1',
+            '1.2.3.0',
+            '1.2.3.0rc',
+            '1.2.3.post2.dev4',
+            '1.2.3.4.5',
+            '1.2.3\n',
+        ):
+            self.assertIsNone(
+                version.SemanticVersion._from_pip_string_canonical(
+                    version_string
+                ),
+                version_string,
+            )
+
+    def test_from_pip_string_cached(self):
+        self.useFixture(
+            fixtures.MockPatchObject(
+                version.SemanticVersion, '_parsed', collections.OrderedDict()
+            )
+        )
+        self.useFixture(
+            fixtures.MockPatchObject(version, '_PIP_STRING_CACHE_SIZE', 2)
+        )
+        with mock.patch.object(
+            version.SemanticVersion,
+            '_from_pip_string_canonical',
+            side_effect=version.SemanticVersion._from_pip_string_canonical,
+        ) as _parse:
+            for version_string in ('1.0', '2.0', '1.0', '3.0', '1.0', '2.0'):
+                from_pip_string(version_string)
+        self.assertEqual(
+            ['1.0', '2.0', '3.0', '2.0'],
+            [call[0][0] for call in _parse.call_args_list],
+        )
+
+    def test_from_pip_string_cached_concurrently(self):
+        self.useFixture(
+            fixtures.MockPatchObject(
+                version.SemanticVersion, '_parsed', collections.OrderedDict()
+            )
+        )
+        self.useFixture(
+            fixtures.MockPatchObject(version, '_PIP_STRING_CACHE_SIZE', 8)
+        )
+        version_strings = ['1.%d' % i for i in range(32)]
+        errors = []
+
+        def _parse():
+            try:
+                for _ in range(20):
+                    for version_string in version_strings:
+                        self.assertEqual(
+                            version_string + '.0',
+                            from_pip_string(version_string).release_string(),
+                        )
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=_parse) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        self.assertEqual(8, len(version.SemanticVersion._parsed))
+
+    def test_equality(self):
+        semver = version.SemanticVersion(1, 2, 3, 'rc', 1, 4)
+        self.assertEqual(semver, version.SemanticVersion(1, 2, 3, 'rc', 1, 4))
+        self.assertEqual(
+            hash(semver), hash(version.SemanticVersion(1, 2, 3, 'rc', 1, 4))
+        )
+        self.assertNotEqual(semver, version.SemanticVersion(1, 2, 3, 'rc', 1))
+        self.assertNotEqual(
+            semver, version.SemanticVersion(1, 2, 3, 'b', 1, 4)
+        )
+        self.assertEqual(
+            version.SemanticVersion(1, 2, 3, dev_count=0),
+            version.SemanticVersion(1, 2, 3),
+        )
+
     def test_final_version(self):
         semver = version.SemanticVersion(1, 2, 3)
         self.assertEqual((1, 2, 3, 'final', 0), semver.version_tuple())
@@ -325,3 +453,189 @@ class TestSemanticVersion(base.BaseTestCase):
             version.SemanticVersion(1, 2, 3, 'rc', 1, dev_count=1),
             version.SemanticVersion(1, 2, 3, 'rc', 1).to_dev(1),
         )
+
+
+class TestVersionSorting(base.BaseTestCase):
+
+    versions = [
+        '1.2.3',
+        'v1.10.0',
+        '1.2.3.0rc1',
+        '1.2.0',
+        '1.2.3.dev4',
+        '1.2',
+        '1.2.3.post1',
+    ]
+
+    def test_sort_versions(self):
+        expected = [
+            '1.2.0',
+            '1.2',
+            '1.2.3.dev4',
+            '1.2.3.0rc1',
+            '1.2.3',
+            '1.2.3.post1',
+            'v1.10.0',
+        ]
+        self.assertEqual(expected, version.sort_versions(self.versions))
+        self.assertEqual(
+            sorted(self.versions, key=from_pip_string),
+            version.sort_versions(self.versions),
+        )
+        self.assertEqual(
+            [
+                'v1.10.0',
+                '1.2.3.post1',
+                '1.2.3',
+                '1.2.3.0rc1',
+                '1.2.3.dev4',
+                '1.2.0',
+                '1.2',
+            ],
+            version.sort_versions(self.versions, reverse=True),
+        )
+
+    def test_max_version(self):
+        self.assertEqual('v1.10.0', version.max_version(iter(self.versions)))
+        self.assertEqual('1.2.0', version.max_version(['1.2.0', '1.2']))
+        self.assertRaises(ValueError, version.max_version, [])
+        self.assertRaises(ValueError, version.max_version, ['1.0', 'foo'])
+
+    def test_bucket_by_release(self):
+        self.assertEqual(
+            [
+                ('1.2.0', ['1.2.0', '1.2']),
+                ('1.2.3', ['1.2.3.dev4', '1.2.3.0rc1', '1.2.3']),
+                ('1.2.4', ['1.2.3.post1']),
+                ('1.10.0', ['v1.10.0']),
+            ],
+            list(version.bucket_by_release(self.versions).items()),
+        )
+
+
+class TestVersionInfo(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestVersionInfo, self).setUp()
+        self.useFixture(
+            fixtures.MockPatchObject(version, '_semantic_versions', {})
+        )
+        self.get_version = self.useFixture(
+            fixtures.MockPatch(
+                'pbr._compat.metadata.get_version', return_value='1.2.3'
+            )
+        ).mock
+
+    def test_shared(self):
+        self.assertEqual('1.2.3', version.VersionInfo('foo').version_string())
+        self.assertEqual('1.2.3', version.VersionInfo('foo').release_string())
+        self.get_version.assert_called_once_with('foo')
+        self.get_version.return_value = '2.0.0'
+        self.assertEqual('2.0.0', version.VersionInfo('bar').version_string())
+
+    def test_concurrent(self):
+        started = threading.Event()
+
+        def _get_version(package):
+            started.set()
+            # Give the other threads time to ask for the version too.
+            time.sleep(0.1)
+            return '1.2.3'
+
+        self.get_version.side_effect = _get_version
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    version.VersionInfo('foo').semantic_version()
+                )
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(started.is_set())
+        self.assertEqual(1, self.get_version.call_count)
+        self.assertEqual(8, len(results))
+        self.assertEqual(1, len(set(map(id, results))))
+
+    def test_shared_by_version_module(self):
+        self.assertEqual('1.2.3', version.VersionInfo('foo').version_string())
+        self.get_version.return_value = '2.0.0'
+        info = version.VersionInfo('foo', version_module='foo.missing')
+        self.assertEqual('2.0.0', info.version_string())
+        self.assertEqual(2, self.get_version.call_count)
+
+    def test_lock_created_when_needed(self):
+        # e.g. by eventlet monkey patching after pbr was imported
+        self.useFixture(fixtures.MockPatchObject(version, '_locks', {}))
+        rlock = self.useFixture(
+            fixtures.MockPatch('threading.RLock', side_effect=threading.RLock)
+        ).mock
+        version.VersionInfo('foo').version_string()
+        version.VersionInfo('bar').version_string()
+        self.assertEqual(1, rlock.call_count)
+
+    def test_error_not_cached(self):
+        self.get_version.side_effect = [ValueError('oops'), '1.2.3']
+        info = version.VersionInfo('foo')
+        self.assertRaises(ValueError, info.version_string)
+        self.assertEqual('1.2.3', info.version_string())
+
+    def _write_version_module(
+        self, package, module='_version', header=version._VERSION_MODULE_HEADER
+    ):
+        path = self.useFixture(fixtures.TempDir()).path
+        os.mkdir(os.path.join(path, 'vmpkg'))
+        with open(os.path.join(path, 'vmpkg', '__init__.py'), 'w'):
+            pass
+        with open(os.path.join(path, 'vmpkg', module + '.py'), 'w') as f:
+            f.write(
+                '%s\npackage = %r\nversion = %r\n'
+                'git_sha = %r\nis_release = True\n'
+                % (header, package, '4.5.6', 'abcdef0')
+            )
+        self.useFixture(fixtures.PythonPathEntry(path))
+        patcher = mock.patch.dict(sys.modules)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_version_module(self):
+        self._write_version_module('vmpkg')
+        __import__('vmpkg')
+        self.assertEqual(
+            '4.5.6', version.VersionInfo('vmpkg').version_string()
+        )
+        self.assertFalse(self.get_version.called)
+
+    def test_version_module_package_not_imported(self):
+        self._write_version_module('vmpkg')
+        self.assertEqual(
+            '1.2.3', version.VersionInfo('vmpkg').version_string()
+        )
+        self.assertNotIn('vmpkg._version', sys.modules)
+
+    def test_version_module_other_package(self):
+        self._write_version_module('other')
+        __import__('vmpkg')
+        self.assertEqual(
+            '1.2.3', version.VersionInfo('vmpkg').version_string()
+        )
+
+    def test_version_module_not_from_pbr(self):
+        self._write_version_module('vmpkg', header='# versioneer')
+        __import__('vmpkg')
+        self.assertEqual(
+            '1.2.3', version.VersionInfo('vmpkg').version_string()
+        )
+        self.assertNotIn('vmpkg._version', sys.modules)
+
+    def test_version_module_named(self):
+        self._write_version_module('python-vmpkg', module='version_info')
+        info = version.VersionInfo(
+            'python_vmpkg', version_module='vmpkg.version_info'
+        )
+        self.assertEqual('4.5.6', info.version_string())
+        self.assertFalse(self.get_version.called)
@@ -20,13 +20,49 @@ Utilities for consuming the version from importlib-metadata.
 from __future__ import absolute_import
 from __future__ import print_function
 
+import collections
+import importlib
+import io
 import itertools
 import operator
+import os
+import re
 import sys
+import threading
+import weakref
 
 import pbr._compat.metadata
 
 
+# The canonical forms of the versions pbr creates: X, X.Y, X.Y.Z, optionally
+# followed by .0aN, .0bN or .0rcN, .devN and .postN, or by the legacy .N or
+# .N.gSHA dev suffix. Anything else is left to the general parser.
+_canonical_version_re = re.compile(
+    r"""
+    [vV]*
+    (?P<major>[0-9]+)
+    (?:
+        \.(?P<minor>[0-9]+)
+        (?:
+            \.(?P<patch>[0-9]+)
+            (?:
+                \.(?P<legacy_dev>0*[1-9][0-9]*)(?:\.g[0-9a-fA-F]+)?
+                |
+                (?:\.0*(?P<prerelease_type>a|b|rc)(?P<prerelease>[0-9]+))?
+                (?:\.dev(?P<dev>[0-9]+))?
+                (?:\.post(?P<post>[0-9]+))?
+            )
+        )?
+    )?
+    \Z
+    """,
+    re.VERBOSE,
+)
+
+# The number of strings from_pip_string remembers the result for.
+_PIP_STRING_CACHE_SIZE = 4096
+
+
 def _is_int(string):
     try:
         int(string)
@@ -41,6 +77,26 @@ class SemanticVersion(object):
     See the pbr doc 'semver' for details on the semantics.
     """
 
+    __slots__ = (
+        '_major',
+        '_minor',
+        '_patch',
+        '_prerelease_type',
+        '_prerelease',
+        '_dev_count',
+        '_key',
+        '__weakref__',
+    )
+
+    # The versions parsed from strings, by their sort key.
+    _interned = weakref.WeakValueDictionary()
+
+    # The most recently parsed strings, least recent first, and their
+    # versions. OrderedDict is not thread-safe on Python 2, so it is only
+    # used with _parsed_lock held.
+    _parsed = collections.OrderedDict()
+    _parsed_lock = threading.Lock()
+
     def __init__(
         self,
         major,
@@ -69,17 +125,29 @@ class SemanticVersion(object):
         if self._prerelease_type and not self._prerelease:
             self._prerelease = 0
         self._dev_count = dev_count or 0  # Normalise 0 to None.
+        self._key = self._make_sort_key()
+
+    @classmethod
+    def _intern(klass, semver):
+        """Return the instance equal to semver that is already in use.
+
+        Versions are never modified, so equal ones can share an instance,
+        which saves memory when the same version is parsed many times.
+        """
+        if type(semver) is not SemanticVersion:
+            return semver
+        return klass._interned.setdefault(semver._key, semver)
 
+    # The sort key holds all of the components, so it identifies a version.
     def __eq__(self, other):
         if not isinstance(other, SemanticVersion):
             return False
-        return self.__dict__ == other.__dict__
+        return self._key == other._key
 
     def __hash__(self):
-        return sum(map(hash, self.__dict__.values()))
+        return hash(self._key)
 
-    def _sort_key(self):
-        """Return a key for sorting SemanticVersion's on."""
+    def _make_sort_key(self):
         # key things:
         # - final is after rc's, so we make that a/b/rc/z
         # - dev==None is after all other devs, so we use sys.maxsize there.
@@ -100,20 +168,20 @@ class SemanticVersion(object):
             self._minor,
             self._patch,
             uq_dev,
-            rc_lookup[self._prerelease_type],
+            rc_lookup.get(self._prerelease_type, self._prerelease_type),
             self._prerelease,
             self._dev_count or sys.maxsize,
         )
 
+    def _sort_key(self):
+        """Return a key for sorting SemanticVersion's on."""
+        return self._key
+
     def __lt__(self, other):
         """Compare self and other, another Semantic Version."""
-        # NB(lifeless) this could perhaps be rewritten as
-        # lt (tuple_of_one, tuple_of_other) with a single check for
-        # the typeerror corner cases - that would likely be faster
-        # if this ever becomes performance sensitive.
         if not isinstance(other, SemanticVersion):
             raise TypeError("ordering to non-SemanticVersion is undefined")
-        return self._sort_key() < other._sort_key()
+        return self._key < other._key
 
     def __le__(self, other):
         return self == other or self < other
@@ -155,10 +223,67 @@ class SemanticVersion(object):
             made them and have stopped doing that.
         """
 
-        try:
-            return klass._from_pip_string_unsafe(version_string)
-        except IndexError:
-            raise ValueError("Invalid version %r" % version_string)
+        parsed = klass._parsed
+        key = (klass, version_string)
+        with klass._parsed_lock:
+            # Take it out to put it back at the end, as the most recently
+            # used.
+            result = parsed.pop(key, None)
+            if result is not None:
+                parsed[key] = result
+                return result
+        result = klass._from_pip_string_canonical(version_string)
+        if result is None:
+            try:
+                result = klass._from_pip_string_unsafe(version_string)
+            except IndexError:
+                raise ValueError("Invalid version %r" % version_string)
+        with klass._parsed_lock:
+            result = klass._intern(result)
+            if key not in parsed and len(parsed) >= _PIP_STRING_CACHE_SIZE:
+                parsed.popitem(last=False)
+            parsed[key] = result
+        return result
+
+    @classmethod
+    def _from_pip_string_canonical(klass, version_string):
+        """Parse version_string, if it is in one of the canonical forms.
+
+        :return: The SemanticVersion, as the general parser would return it,
+            or None if version_string needs the general parser.
+        """
+        match = _canonical_version_re.match(version_string)
+        if match is None:
+            return None
+        (
+            major,
+            minor,
+            patch,
+            legacy_dev,
+            prerelease_type,
+            prerelease,
+            dev,
+            post,
+        ) = match.groups()
+        if prerelease is not None:
+            prerelease = int(prerelease)
+        if post is not None:
+            dev = None
+        elif legacy_dev is not None:
+            dev = int(legacy_dev)
+        elif dev is not None:
+            dev = int(dev)
+        result = SemanticVersion(
+            int(major),
+            int(minor) if minor else 0,
+            int(patch) if patch else 0,
+            prerelease_type,
+            prerelease,
+            dev,
+        )
+        if post is not None and int(post):
+            result = result.increment().to_dev(int(post))
+        return result
 
     @classmethod
     def _from_pip_string_unsafe(klass, version_string):
@@ -450,15 +575,162 @@ class SemanticVersion(object):
         return tuple(segments)
 
 
+def _make_version_key():
+    """Return a function mapping version strings to their sort keys.
+
+    It remembers the keys itself, rather than through the memo of
+    :meth:`SemanticVersion.from_pip_string`, so that a large batch of
+    versions neither evicts the versions the process is using nor creates
+    objects that are only needed for their keys.
+    """
+    keys = {}
+
+    def _version_key(version_string):
+        try:
+            return keys[version_string]
+        except KeyError:
+            pass
+        semver = SemanticVersion._from_pip_string_canonical(version_string)
+        if semver is None:
+            semver = SemanticVersion.from_pip_string(version_string)
+        key = keys[version_string] = semver._key
+        return key
+
+    return _version_key
+
+
+def sort_versions(versions, reverse=False):
+    """Sort version strings by their SemanticVersion ordering.
+
+    Each string is parsed once, and the strings are sorted on plain tuples
+    rather than by comparing SemanticVersion objects.
+
+    :param versions: An iterable of version strings, as accepted by
+        :meth:`SemanticVersion.from_pip_string`.
+    :param reverse: Sort from the highest version to the lowest instead.
+    :return: A list of the strings, unchanged, in order.
+    :raises ValueError: If any string is not a valid version.
+    """
+    return sorted(versions, key=_make_version_key(), reverse=reverse)
+
+
+def max_version(versions):
+    """Return the highest of the version strings in versions.
+
+    versions is only iterated over once, so it may be a generator.
+
+    :raises ValueError: If versions is empty or any string in it is not a
+        valid version.
+    """
+    version_key = _make_version_key()
+    iterator = iter(versions)
+    try:
+        highest = next(iterator)
+    except StopIteration:
+        raise ValueError("max_version() arg is an empty iterable")
+    highest_key = version_key(highest)
+    for version_string in iterator:
+        key = version_key(version_string)
+        if key > highest_key:
+            highest, highest_key = version_string, key
+    return highest
+
+
+def bucket_by_release(versions):
+    """Group version strings by the release they are versions of.
+
+    Pre-release and dev versions belong to the release they lead up to, so
+    1.2.3.0rc1 and 1.2.3.dev4 are grouped with 1.2.3.
+
+    :return: An OrderedDict of the releases, as X.Y.Z strings from the lowest
+        to the highest, to the sorted list of the strings in versions that
+        belong to each.
+    :raises ValueError: If any string in versions is not a valid version.
+    """
+    version_key = _make_version_key()
+    releases = {}
+    for version_string in versions:
+        key = version_key(version_string)
+        releases.setdefault(key[:3], []).append((key, version_string))
+    buckets = collections.OrderedDict()
+    for release in sorted(releases):
+        buckets['%s.%s.%s' % release] = [
+            version_string
+            for key, version_string in sorted(
+                releases[release], key=operator.itemgetter(0)
+            )
+        ]
+    return buckets
+
+
+# The SemanticVersion of each package a VersionInfo has been resolved for,
+# by package and version module, shared by all the VersionInfo instances
+# for them. The lock makes sure each is only resolved once, and is
+# reentrant as resolving one package may import another that creates its
+# own VersionInfo.
+_semantic_versions = {}
+_locks = {}
+
+
+def _get_semantic_versions_lock():
+    # The lock is only created when first needed, so that it is a green
+    # lock if eventlet or gevent have monkey patched threading by then,
+    # even if that happened after pbr was imported. setdefault makes sure
+    # concurrent callers all get the same lock.
+    lock = _locks.get('semantic_versions')
+    if lock is None:
+        lock = _locks.setdefault('semantic_versions', threading.RLock())
+    return lock
+
+
+_name_separators_re = re.compile(r'[-_.]+')
+
+
+def _normalize_name(name):
+    return _name_separators_re.sub('-', name).lower()
+
+
+# The first line of the modules written for the [pbr] version_module
+# option.
+_VERSION_MODULE_HEADER = (
+    '# This file is generated by pbr from git when the package is built.'
+)
+
+
+def _has_version_module(package):
+    """Return whether package has a _version module written by pbr.
+
+    Other tools write _version modules too, so the file is checked before
+    anything is imported from it.
+    """
+    for path in getattr(package, '__path__', None) or ():
+        try:
+            with io.open(
+                os.path.join(path, '_version.py'), 'r', encoding='utf-8'
+            ) as version_module:
+                header = version_module.readline().rstrip()
+        except (IOError, OSError, ValueError):
+            continue
+        return header == _VERSION_MODULE_HEADER
+    return False
+
+
 class VersionInfo(object):
 
-    def __init__(self, package):
+    def __init__(self, package, version_module=None):
         """Object that understands versioning for a package
 
         :param package: name of the python package, such as glance, or
                         python-glanceclient
+        :param version_module: name of the module written by the
+                        ``version_module`` option, such as
+                        glanceclient._version. By default it is
+                        ``<package>._version``, looked for only once the
+                        package has been imported, and only imported if
+                        pbr wrote it.
         """
         self.package = package
+        self.version_module = version_module
         self.version = None
         self._cached_version = None
         self._semantic = None
@@ -482,10 +754,54 @@ class VersionInfo(object):
         return self.semantic_version().release_string()
 
     def semantic_version(self):
-        """Return the SemanticVersion object for this version."""
+        """Return the SemanticVersion object for this version.
+
+        This is only looked up once per process for each package and
+        version module, however many VersionInfo instances there are for
+        them.
+        """
         if self._semantic is not None:
             return self._semantic
 
+        key = (self.package, self.version_module)
+        semantic = _semantic_versions.get(key)
+        if semantic is None:
+            with _get_semantic_versions_lock():
+                semantic = _semantic_versions.get(key)
+                if semantic is None:
+                    semantic = self._resolve_semantic_version()
+                    _semantic_versions[key] = semantic
+        self._semantic = semantic
+
+        return self._semantic
+
+    def _get_version_module(self):
+        name = self.version_module
+        if name is None:
+            package = self.package.replace('-', '_')
+            # Don't search sys.path for a package which isn't there: if it
+            # hasn't been imported, neither has the module in it.
+            module = sys.modules.get(package)
+            if module is None or not _has_version_module(module):
+                return None
+            name = package + '._version'
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            return None
+        # Only trust a module which was written for this package by pbr.
+        package = getattr(module, 'package', None)
+        if package is None or (
+            _normalize_name(package) != _normalize_name(self.package)
+        ):
+            return None
+        return module
+
+    def _resolve_semantic_version(self):
+        module = self._get_version_module()
+        if module is not None:
+            return SemanticVersion.from_pip_string(module.version)
+
         try:
             result_string = pbr._compat.metadata.get_version(self.package)
         except pbr._compat.metadata.PackageNotFound:
@@ -496,9 +812,7 @@ class VersionInfo(object):
 
             result_string = packaging.get_version(self.package)
 
-        self._semantic = SemanticVersion.from_pip_string(result_string)
-
-        return self._semantic
+        return SemanticVersion.from_pip_string(result_string)
 
     def version_string(self):
         """Return the short version minus any alpha/beta tags."""
@@ -0,0 +1,80 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Time the parsing of a large, constraints-style requirements file.
+
+Run from the root of the pbr tree with::
+
+    PYTHONPATH=. python tools/benchmark_requirements.py [--lines N]
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+from pbr import packaging
+
+
+def _write_requirements(path, lines):
+    with open(path, 'w') as f:
+        f.write('# constraints for the benchmark\n')
+        f.write('--index-url https://pypi.example.com/simple\n')
+        for i in range(lines):
+            if i % 100 == 0:
+                f.write(
+                    '-e git+https://example.com/p%d#egg=p%d-1.2.3\n' % (i, i)
+                )
+            elif i % 50 == 0:
+                f.write('https://example.com/p%d.tar.gz#egg=p%d\n' % (i, i))
+            elif i % 10 == 0:
+                f.write('package-%d===1.%d.0;python_version>="3.6"\n' % (i, i))
+            elif i % 7 == 0:
+                f.write('# package-%d is pinned below\n' % i)
+            else:
+                f.write('package-%d===1.%d.0\n' % (i, i))
+
+
+def _parse(path):
+    # Don't let the store of parsed files short-circuit the benchmark.
+    packaging._parsed_requirements.clear()
+    packaging.parse_requirements([path])
+    packaging.parse_requirements([path], strip_markers=True)
+    packaging.parse_dependency_links([path])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    tempdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tempdir, 'upper-constraints.txt')
+        _write_requirements(path, args.lines)
+        timer = timeit.Timer(lambda: _parse(path))
+        best = min(timer.repeat(repeat=3, number=args.number)) / args.number
+    finally:
+        shutil.rmtree(tempdir)
+    print(
+        '%d lines: %.2f ms per parse, %.2f us per line'
+        % (args.lines, best * 1000, best * 1e6 / args.lines)
+    )
+
+
+if __name__ == '__main__':
+    main()
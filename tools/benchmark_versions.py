@@ -0,0 +1,124 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Time the parsing and sorting of many SemanticVersions, and their memory.
+
+Run from the root of the pbr tree with::
+
+    PYTHONPATH=. python tools/benchmark_versions.py [--versions N]
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import itertools
+import random
+import timeit
+import tracemalloc
+
+from pbr import version
+
+
+def _version_strings(count):
+    strings = []
+    for i in range(count):
+        release = '%d.%d.%d' % (i // 1000, i // 10 % 100, i % 10)
+        strings.append(release)
+        if i % 5 == 0:
+            strings.append('%s.0rc%d' % (release, i % 3 + 1))
+        if i % 7 == 0:
+            strings.append('%s.dev%d' % (release, i % 50 + 1))
+    return strings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--versions', type=int, default=5000)
+    parser.add_argument('--number', type=int, default=10)
+    args = parser.parse_args()
+
+    strings = _version_strings(args.versions)
+    # Tags are typically seen several times, e.g. once per branch.
+    strings = strings * 3
+    random.Random(0).shuffle(strings)
+
+    def _clear():
+        # Don't let the strings parsed before short-circuit the benchmark.
+        version.SemanticVersion._parsed.clear()
+
+    def _parse():
+        _clear()
+        return [version.SemanticVersion.from_pip_string(s) for s in strings]
+
+    timer = timeit.Timer(_parse)
+    best_parse = min(timer.repeat(repeat=3, number=1))
+
+    version.SemanticVersion._parsed.clear()
+    tracemalloc.start()
+    versions = _parse()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    timer = timeit.Timer(lambda: sorted(versions))
+    best = min(timer.repeat(repeat=3, number=args.number)) / args.number
+    timer = timeit.Timer(lambda: max(versions))
+    best_max = min(timer.repeat(repeat=3, number=args.number)) / args.number
+
+    print(
+        '%d versions (%d distinct): parsed in %.2f ms, %.0f KiB, '
+        'sorted in %.2f ms, max in %.2f ms'
+        % (
+            len(versions),
+            len(set(strings)),
+            best_parse * 1000,
+            memory / 1024.0,
+            best * 1000,
+            best_max * 1000,
+        )
+    )
+
+    # The batch API against sorting the strings on SemanticVersions, both
+    # starting without any strings parsed.
+    from_pip_string = version.SemanticVersion.from_pip_string
+    for name, naive, batch in (
+        (
+            'sort',
+            lambda: sorted(strings, key=from_pip_string),
+            lambda: version.sort_versions(strings),
+        ),
+        (
+            'max',
+            lambda: max(strings, key=from_pip_string),
+            lambda: version.max_version(strings),
+        ),
+        (
+            'bucket',
+            lambda: [
+                (release, list(group))
+                for release, group in itertools.groupby(
+                    sorted(strings, key=from_pip_string),
+                    key=lambda s: from_pip_string(s).brief_string(),
+                )
+            ],
+            lambda: version.bucket_by_release(strings),
+        ),
+    ):
+        results = []
+        for function in (naive, batch):
+            timer = timeit.Timer(function, setup=_clear)
+            results.append(min(timer.repeat(repeat=3, number=1)) * 1000)
+        print('%s: naive %.2f ms, batch %.2f ms' % ((name,) + tuple(results)))
+
+
+if __name__ == '__main__':
+    main()